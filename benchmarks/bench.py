@@ -0,0 +1,230 @@
+import argparse
+import contextlib
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+sys.path.insert(0, os.path.join(ROOT, 'ui'))
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+from core import core, simulation
+
+try:
+    import pygame
+except ImportError:
+    pygame = None
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+BENCHMARKS = {}
+
+def benchmark(name):
+    # a benchmark is a setup function returning the callable to time, one op per call
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+def new_game(seed=0):
+    lookup = core.create_defense_lookup_table()
+    game = core.Game(core.Player("player1"), core.Player("player2"), lookup, seed)
+    game.coin_toss()
+    return game
+
+@benchmark("core.create_defense_lookup_table")
+def bench_table_build():
+    return core.create_defense_lookup_table
+
+@benchmark("core.Rally.calc_outcome")
+def bench_calc_outcome():
+    game = new_game()
+    game.update(core.ATTACKS.CUT, 'attack')
+    game.update(core.BLOCKS.DIA, 'block')
+    game.update(core.DEFENSES.DIA_HIT, 'defense1')
+    game.current_defender.set_defense2(core.DEFENSES.LINE_SHOT)
+    def run():
+        core.Rally(game.current_attacker, game.current_defender, game.lookup, game.random).calc_outcome()
+    return run
+
+@benchmark("core.Game.play_rally")
+def bench_play_rally():
+    game = new_game()
+    for player in game.players:
+        player.set_attack(core.ATTACKS.LINE_HIT)
+        player.set_block(core.BLOCKS.LINE)
+        player.set_defense(core.DEFENSES.CUT, core.DEFENSES.DIA_SHOT)
+    return game.play_rally
+
+@benchmark("core.Game.update")
+def bench_update():
+    game = new_game()
+    def run():
+        game.update(core.ATTACKS.DIA_SHOT, 'attack')
+        game.update(core.BLOCKS.DIA, 'block')
+        game.update(core.DEFENSES.LINE_HIT, 'defense1')
+        game.update(core.DEFENSES.SHORT_POKE, 'defense2')
+    return run
+
+@benchmark("core.print_commentary")
+def bench_print_commentary():
+    comment = core.SUCCESSFUL_ATTACK_TEXT_LOOKUP[75]
+    def run():
+        core.print_commentary(comment, core.ATTACKS.LINE_HIT, core.BLOCKS.LINE, core.BLOCKS.LINE, "player1", "player2")
+    return run
+
+@benchmark("core.Game full match")
+def bench_full_game():
+    lookup = core.create_defense_lookup_table()
+    attacks = core.ATTACKS.ATTACK_LIST
+    def run():
+        game = core.Game(core.Player("player1"), core.Player("player2"), lookup, 0)
+        game.coin_toss()
+        rally = 0
+        while not game.game_finished():
+            game.update(attacks[rally % len(attacks)], 'attack')
+            game.update(core.BLOCKS.DIA, 'block')
+            game.update(core.DEFENSES.CUT, 'defense1')
+            game.update(core.DEFENSES.LINE_HIT, 'defense2')
+            rally += 1
+    return run
+
+@benchmark("simulation.simulate_matches x1000")
+def bench_simulate_matches():
+    lookup = core.create_defense_lookup_table()
+    return lambda: simulation.simulate_matches(1000, lookup, rng=0)
+
+def ui_setup():
+    import sprites
+    pygame.init()
+    screen = pygame.display.set_mode((sprites.SCREEN_WIDTH, sprites.SCREEN_HEIGHT))
+    return sprites, screen
+
+def frame(screen, sprite, score_sprite, background):
+    screen.fill(background)
+    screen.blit(sprite.surf, sprite.rect)
+    screen.blit(score_sprite.surf, score_sprite.rect)
+    pygame.display.flip()
+
+@benchmark("ui.ChooseSprite frame")
+def bench_choose_frame():
+    sprites, screen = ui_setup()
+    choose = sprites.ChooseSprite(core.ATTACKS.ATTACK_LIST, "attack")
+    score = sprites.ScoreSprite()
+    def run():
+        choose.update("", "")
+        frame(screen, choose, score, sprites.MIK_YELLOW)
+    return run
+
+@benchmark("ui.ResultSprite frame")
+def bench_result_frame():
+    sprites, screen = ui_setup()
+    result = sprites.ResultSprite()
+    score = sprites.ScoreSprite()
+    def run():
+        result.update("player1 uses the line block from player2", "defence score: 71.21, attack score: 80.02")
+        frame(screen, result, score, sprites.MIK_YELLOW)
+    return run
+
+@benchmark("ui.ScoreSprite frame")
+def bench_score_frame():
+    sprites, screen = ui_setup()
+    choose = sprites.ChooseSprite(core.BLOCKS.BLOCK_LIST, "block")
+    score = sprites.ScoreSprite()
+    points = {"player1": 12, "player2": 17}
+    def run():
+        score.update(points, "player1", "player2")
+        frame(screen, choose, score, sprites.MIK_YELLOW)
+    return run
+
+def time_benchmark(setup, repeat=5, min_time=0.2):
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        run = setup()
+        number = 1
+        while True:
+            start = time.perf_counter()
+            for _ in range(number):
+                run()
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_time / 10 or number >= 1 << 20:
+                break
+            number *= 2
+        number = max(1, int(number * min_time / max(elapsed, 1e-9)))
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(number):
+                run()
+            timings.append((time.perf_counter() - start) / number)
+    return {"ops": number, "repeat": repeat, "per_op_min": min(timings), "per_op_median": statistics.median(timings)}
+
+def run_benchmarks(selected, repeat, min_time):
+    results = {}
+    for name, setup in BENCHMARKS.items():
+        if selected and not any(pattern in name for pattern in selected):
+            continue
+        if name.startswith("ui.") and pygame is None:
+            print(f"skipping {name}: pygame is not installed", file=sys.stderr)
+            continue
+        results[name] = time_benchmark(setup, repeat, min_time)
+        print(f"{name:40s} {results[name]['per_op_min']*1e6:12.2f} us/op", file=sys.stderr)
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pygame": pygame.version.ver if pygame is not None else None,
+            "machine": platform.machine(),
+        },
+        "benchmarks": results,
+    }
+
+def compare(results, baseline, tolerance):
+    # ratio of best per-op times, above 1 + tolerance counts as a regression
+    regressions = []
+    for name, result in results["benchmarks"].items():
+        if name not in baseline["benchmarks"]:
+            continue
+        ratio = result["per_op_min"] / baseline["benchmarks"][name]["per_op_min"]
+        result["baseline_ratio"] = ratio
+        marker = "REGRESSION" if ratio > 1 + tolerance else ""
+        print(f"{name:40s} {ratio:8.3f}x baseline {marker}", file=sys.stderr)
+        if marker:
+            regressions.append(name)
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="beach chess benchmarks")
+    parser.add_argument("-k", "--filter", action="append", default=[], help="only run benchmarks containing this text")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds per repeat")
+    parser.add_argument("--output", help="write the JSON results here instead of stdout")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="results to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.filter, args.repeat, args.min_time)
+    regressions = []
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+
+    output = json.dumps(results, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    return 1 if regressions else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,10 +1,16 @@
 import os
+import sys
 from collections import namedtuple
 import numpy as np
 
-BLOCK_CHANCE = {"match": 75, "direction_match": 25}
-ATTACK_DEFENSE_MATCH_CHANCE = {0: 90, 1: 55}
-GENERAL_ATTACK_MISTAKE_CHANCE = 5
+# compiled rulesets and the computer opponent live in the core package of the pygame ui
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'ui'))
+from core.ai import ruleset_adaptive_opponent
+from core.cache import ruleset_for
+from core.probability import NOISY_DEFENSE
+from core.rules import load_rules, require_actions
+
+WINNING_SCORE = 15
 
 SINGLE_PLAYER_MODE = "single-player"
 MULTI_PLAYER_MODE = "mutli-player"
@@ -90,8 +96,9 @@ def ask_input_until_plausible(prompt, plausible):
     return value
 
 class Player:
-    def __init__(self, name):
+    def __init__(self, name, computer=None):
         self.name = name
+        self.computer = computer
         self.attack = Attack(-1, "")
         self.block = Block(-1, "")
         self.defense1 = Defense(-1, "")
@@ -142,8 +149,7 @@ class Rally:
         defenses = self.defender.get_defense()
         block = self.defender.get_block()
         attack = self.attacker.get_attack()
-        defense_chances = np.array([self.lookup[(attack.index, block.index, 0, defenses[0].index)], self.lookup[(attack.index, block.index, 1, defenses[1].index)]])
-        self.defense_chance = np.max(defense_chances)
+        self.defense_chance = int(defense_chances(self.lookup, attack.index, block.index, defenses[0].index, defenses[1].index))
         self.defense_score = self.defense_chance * np.random.uniform(low=0.95, high=1.05, size=1)[0]
         self.attack_score = np.random.randint(0, 101)
         self.print_rally()
@@ -164,11 +170,21 @@ class Game:
         self.current_attacker = self.players[abs(coin-1)]
 
     def choose_attack(self):
+        player = self.current_attacker
+        if player.computer is not None:
+            player.set_attack(player.computer.choose_attack(self.score[player.name], self.score[self.current_defender.name]))
+            return
         chosen_attack = ask_input_until_plausible(f"{self.current_attacker.name}, choose an attack ({action_list_to_string(ATTACKS.ATTACK_LIST)}): ", len(ATTACKS.ATTACK_LIST))
         os.system('clear')
         self.current_attacker.set_attack(ATTACKS.ATTACK_DICT[chosen_attack])
 
     def choose_defense(self):
+        player = self.current_defender
+        if player.computer is not None:
+            block, defense1, defense2 = player.computer.choose_defense(self.score[player.name], self.score[self.current_attacker.name])
+            player.set_defense(defense1, defense2)
+            player.set_block(block)
+            return
         chosen_block = ask_input_until_plausible(f"{self.current_defender.name}, choose a block ({action_list_to_string(BLOCKS.BLOCK_LIST)}): ", len(BLOCKS.BLOCK_LIST))
         chosen_defense1 = ask_input_until_plausible(f"{self.current_defender.name}, choose the first defense ({action_list_to_string(DEFENSES.DEFENSE_LIST)}): ", len(DEFENSES.DEFENSE_LIST))
         chosen_defense2 = ask_input_until_plausible(f"{self.current_defender.name}, choose the second defense ({action_list_to_string(DEFENSES.DEFENSE_LIST)}): ", len(DEFENSES.DEFENSE_LIST))
@@ -178,7 +194,7 @@ class Game:
 
     def game_finished(self):
         points = list(self.score.values())
-        if points[0] < 15 and points[1] < 15:
+        if points[0] < WINNING_SCORE and points[1] < WINNING_SCORE:
             return False
         if abs(points[0] - points[1]) < 2:
             return False
@@ -188,50 +204,39 @@ class Game:
         os.system('clear')
         self.choose_attack()
         self.choose_defense()
-        rally = Rally(self.current_attacker, self.current_defender, self.lookup)
+        attacker, defender = self.current_attacker, self.current_defender
+        move = (attacker.attack.index, defender.block.index, defender.defense1.index, defender.defense2.index)
+        for player, opponent in [(attacker, defender), (defender, attacker)]:
+            if player.computer is not None:
+                player.computer.observe_rally(move, player is attacker, self.score[player.name], self.score[opponent.name])
+        rally = Rally(attacker, defender, self.lookup)
         self.current_defender, self.current_attacker = rally.calc_outcome()
         self.score[self.current_defender.name] += 1
         print(f"{Font.GREEN}{self.score}{Font.END}")
         input("Next rally...")
 
-def create_defense_lookup_table():
-    attack = np.arange(0, len(ATTACKS.ATTACK_LIST)+1, 1)
-    block = np.arange(0, len(BLOCKS.BLOCK_LIST)+1, 1)
-    defence_choice = np.arange(0, 2, 1)
-    defense = np.arange(0, len(DEFENSES.DEFENSE_LIST)+1, 1)
-
-    mesh = np.array(np.meshgrid(attack, block, defence_choice, defense))
-    combinations = mesh.T.reshape(-1, 4)
-    lookup = {}
-    for comb in combinations:
-        if comb[0] == comb[3]:
-            lookup[tuple(comb.tolist())] = ATTACK_DEFENSE_MATCH_CHANCE[comb[2]]
-        elif comb[0] == 0 and comb[1] == 0:
-            lookup[tuple(comb.tolist())] = BLOCK_CHANCE["direction_match"]
-        elif comb[0] == 1 and comb[1] == 0:
-            lookup[tuple(comb.tolist())] = BLOCK_CHANCE["match"]
-        elif comb[0] == 2 and comb[1] == 0:
-            lookup[tuple(comb.tolist())] = BLOCK_CHANCE["direction_match"]
-        elif comb[0] == 3 and comb[1] == 1:
-            lookup[tuple(comb.tolist())] = BLOCK_CHANCE["match"]
-        elif comb[0] == 4 and comb[1] == 1:
-            lookup[tuple(comb.tolist())] = BLOCK_CHANCE["direction_match"]
-        else:
-            lookup[tuple(comb.tolist())] = GENERAL_ATTACK_MISTAKE_CHANCE
+# this front end keeps the rules from before the spob block rule
+RULES = load_rules("classic")
+require_actions(RULES, [a.name for a in ATTACKS.ATTACK_LIST], [b.name for b in BLOCKS.BLOCK_LIST], [d.name for d in DEFENSES.DEFENSE_LIST])
 
-    return lookup
+def defense_chances(lookup, attack, block, defense1, defense2):
+    return np.maximum(lookup[attack, block, 0, defense1], lookup[attack, block, 1, defense2])
 
 
 def play_game(mode):
-    lookup = create_defense_lookup_table()
-    # print(lookup)
-    if mode == SINGLE_PLAYER_MODE:
-        pass
+    ruleset = ruleset_for(RULES, NOISY_DEFENSE)
+    lookup = ruleset.lookup
     os.system('clear')
     player1_name = input("Player 1 Name: ")
-    player2_name = input("Player 2 Name: ")
+    if mode == SINGLE_PLAYER_MODE:
+        # the score is keyed by name, the computer steps aside for a player called computer
+        player2_name = "computer" if player1_name != "computer" else "computer 2"
+        player2 = Player(player2_name, ruleset_adaptive_opponent(ruleset, target=WINNING_SCORE))
+    else:
+        player2_name = input("Player 2 Name: ")
+        player2 = Player(player2_name)
     assert player1_name != player2_name, "Enter two different names, please!"
-    game = Game(Player(player1_name), Player(player2_name), lookup)
+    game = Game(Player(player1_name), player2, lookup)
     game.coin_toss()
     while not game.game_finished():
         game.play()
@@ -241,6 +246,6 @@ def play_game(mode):
 
 if __name__ == '__main__':
     try:
-        play_game(MULTI_PLAYER_MODE)
+        play_game(sys.argv[1] if len(sys.argv) > 1 else MULTI_PLAYER_MODE)
     except KeyboardInterrupt:
         print(f"\n{Font.RED}ABORTED")
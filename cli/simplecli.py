@@ -1,31 +1,19 @@
 import os
+import sys
 import numpy as np
 
+# compiled rulesets are cached by the core package of the pygame ui
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'ui'))
+from core.cache import ruleset_for
+from core.probability import NO_NOISE
+from core.rules import load_rules
 
-ATTACK_DICT = {
-    0: "cut",
-    1: "dia hit",
-    2: "dia shot",
-    3: "line hit",
-    4: "line shot"
-}
-
-BLOCK_DICT = {
-    0: "dia",
-    1: "line"
-}
+# the five actions and rules of this front end, without the spob
+RULES = load_rules("simple")
 
-DEFENSE_DICT = {
-    0: "cut",
-    1: "dia hit",
-    2: "dia shot",
-    3: "line hit",
-    4: "line shot"
-}
-
-BLOCK_CHANCE = {"match": 75, "direction_match": 25}
-ATTACK_DEFENSE_MATCH_CHANCE = {0: 90, 1: 55}
-GENERAL_ATTACK_MISTAKE_CHANCE = 5
+ATTACK_DICT = dict(enumerate(RULES.attacks))
+BLOCK_DICT = dict(enumerate(RULES.blocks))
+DEFENSE_DICT = dict(enumerate(RULES.defenses))
 
 SINGLE_PLAYER_MODE = "single-player"
 MULTI_PLAYER_MODE = "mutli-player"
@@ -59,31 +47,6 @@ class font:
    END = '\033[0m'
 
 
-def create_defense_lookup_table():
-    attack = np.arange(0, 8, 1)
-    block = np.arange(0, 3, 1)
-    defence_choice = np.arange(0, 2, 1)
-    defense = np.arange(0, 8, 1)
-
-    mesh = np.array(np.meshgrid(attack, block, defence_choice, defense))
-    combinations = mesh.T.reshape(-1, 4)
-    lookup = {}
-    for comb in combinations:
-        if comb[0] == comb[3]:
-            lookup[tuple(comb.tolist())] = ATTACK_DEFENSE_MATCH_CHANCE[comb[2]]
-        elif (comb[0] == 0 or comb[0] == 2) and comb[1] == 0:
-            lookup[tuple(comb.tolist())] = BLOCK_CHANCE["direction_match"]
-        elif comb[0] == 1 and comb[1] == 0:
-            lookup[tuple(comb.tolist())] = BLOCK_CHANCE["match"]
-        elif comb[0] == 3 and comb[1] == 1:
-            lookup[tuple(comb.tolist())] = BLOCK_CHANCE["match"]
-        elif comb[0] == 4 and comb[1] == 1:
-            lookup[tuple(comb.tolist())] = BLOCK_CHANCE["direction_match"]
-        else:
-            lookup[tuple(comb.tolist())] = GENERAL_ATTACK_MISTAKE_CHANCE
-
-    return lookup
-
 def print_commentary(comment, attack, block, defense, attacker, defender):
     comment = comment.replace('[attack]', ATTACK_DICT[attack])
     comment = comment.replace('[block]', BLOCK_DICT[block])
@@ -128,9 +91,9 @@ def defense_input(player):
     return np.array([first_defense, second_defense])
 
 def calculate_point(lookup, attack_player, defense_player, attack, block, defenses):
-    defense_chances = np.array([lookup[(attack, block, 0, defenses[0])], lookup[(attack, block, 1, defenses[1])]])
+    defense_chances = lookup[attack, block, [0, 1], defenses]
     defense_chance_max_idx = np.argmax(defense_chances)
-    defense_chance = np.max(defense_chances)
+    defense_chance = int(defense_chances[defense_chance_max_idx])
     attack_score = np.random.randint(0, 101)
     print_rally(attack, block, defenses[defense_chance_max_idx], defense_chance, attack_score, attack_player, defense_player)
     return (defense_player, attack_player) if attack_score <= defense_chance else (attack_player, defense_player)
@@ -173,7 +136,8 @@ def multi_player(lookup):
     print(f"Endscore: {font.PURPLE}{points_dict}{font.END}")
 
 def play(mode):
-    lookup = create_defense_lookup_table()
+    # the equilibrium tables assume the six attacks of the other front ends
+    lookup = ruleset_for(RULES, NO_NOISE, with_equilibrium=False).lookup
     if mode == SINGLE_PLAYER_MODE:
         pass
     else:
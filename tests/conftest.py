@@ -0,0 +1,8 @@
+import os
+import sys
+import tempfile
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+sys.path.insert(0, os.path.join(ROOT, 'ui'))
+# compiled rulesets go to a throwaway cache instead of ~/.cache/beach-chess
+os.environ.setdefault("BEACH_CHESS_CACHE", tempfile.mkdtemp(prefix="beach-chess-tests-"))
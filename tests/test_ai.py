@@ -0,0 +1,23 @@
+import numpy as np
+
+from core import ai
+
+def opponent(**options):
+    return ai.AdaptiveOpponent(
+        np.zeros((len(ai.ATTACKS.ATTACK_LIST), len(ai.DEFENSE_ACTIONS))),
+        ai.cumulative_policy(np.ones(len(ai.ATTACKS.ATTACK_LIST))),
+        ai.cumulative_policy(np.ones(len(ai.DEFENSE_ACTIONS))),
+        np.random.default_rng(0),
+        **options,
+    )
+
+def test_late_game_follows_target():
+    assert ai.score_context(11, 11) == 1
+    assert ai.score_context(11, 11, late_game=11) == 4
+    # a game to 15 is late from 11 points on, one to 21 from 17
+    short = opponent(target=15)
+    short.observe_rally((0, 0, 0, 0), False, 11, 11)
+    assert short.attack_seen.nonzero()[0].tolist() == [4]
+    long = opponent()
+    long.observe_rally((0, 0, 0, 0), False, 11, 11)
+    assert long.attack_seen.nonzero()[0].tolist() == [1]
@@ -0,0 +1,14 @@
+from core import cache, core
+from core.rules import parse_rules, rules_dict
+
+def test_one_key_per_ruleset(tmp_path):
+    renamed = rules_dict(core.RULES)
+    renamed["name"] = "beach, renamed"
+    assert cache.ruleset_key(parse_rules(renamed)) == cache.ruleset_key(core.RULES)
+    changed = rules_dict(core.RULES)
+    changed["mistake_chance"] += 1
+    assert cache.ruleset_key(parse_rules(changed)) != cache.ruleset_key(core.RULES)
+    assert cache.ruleset_key(core.RULES, with_equilibrium=False) != cache.ruleset_key(core.RULES)
+    ruleset = cache.ruleset_for(core.RULES, with_equilibrium=False, cache_dir=str(tmp_path))
+    assert ruleset.key == cache.ruleset_key(core.RULES, with_equilibrium=False)
+    assert (tmp_path / ruleset.key / "lookup.npy").exists()
@@ -0,0 +1,9 @@
+import pytest
+
+from core import calibrate
+
+def test_distance_is_relative():
+    assert calibrate.distance({"value": 0.5, "length": 30.0}, {"value": 0.4, "length": 40.0}) == pytest.approx(0.25**2 + 0.25**2)
+
+def test_distance_to_zero_target_is_absolute():
+    assert calibrate.distance({"value": 0.5, "entropy": 0.2}, {"entropy": 0.0}) == pytest.approx(0.04)
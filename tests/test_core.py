@@ -0,0 +1,34 @@
+import numpy as np
+
+from core import core
+
+def play(seed, moves):
+    game = core.Game(core.Player("a"), core.Player("b"), core.create_defense_lookup_table(), seed, verbose=False)
+    game.coin_toss()
+    rallies = 0
+    while not game.game_finished():
+        attack, block, defense1, defense2 = moves[rallies % len(moves)]
+        game.update(core.ATTACKS.ATTACK_DICT[attack], 'attack')
+        game.update(core.BLOCKS.BLOCK_DICT[block], 'block')
+        game.update(core.DEFENSES.DEFENSE_DICT[defense1], 'defense1')
+        game.update(core.DEFENSES.DEFENSE_DICT[defense2], 'defense2')
+        rallies += 1
+    return game
+
+def random_moves(rng, n=40):
+    return [tuple(int(x) for x in rng.integers(0, [6, 2, 6, 6])) for _ in range(n)]
+
+def test_replay_is_bit_identical(capsys):
+    rng = np.random.default_rng(3)
+    for seed in range(5):
+        game = play(seed, random_moves(rng))
+        replayed = core.replay(core.Player("a"), core.Player("b"), game.lookup, game.random.seed_sequence, game.moves)
+        assert replayed.score == game.score
+        assert replayed.moves == game.moves
+        assert replayed.current_defender.name == game.current_defender.name
+        assert replayed.random.rng.bit_generator.state == game.random.rng.bit_generator.state
+
+def test_same_seed_same_match():
+    moves = random_moves(np.random.default_rng(4))
+    first, second = play(11, moves), play(11, moves)
+    assert first.score == second.score and first.moves == second.moves
@@ -0,0 +1,30 @@
+from core import ai, core, engine
+
+def single_player_loop(computer_serves):
+    human = core.Player("human")
+    computer = core.Player("computer", ai.ScriptedOpponent([core.ATTACKS.CUT], [(core.BLOCKS.DIA, core.DEFENSES.CUT, core.DEFENSES.LINE_HIT)]))
+    game = core.Game(human, computer, core.create_defense_lookup_table(), 0, verbose=False)
+    game.current_defender, game.current_attacker = (computer, human) if computer_serves else (human, computer)
+    return engine.GameLoop(game)
+
+def test_computer_defense_is_one_snapshot():
+    loop = single_player_loop(computer_serves=True)
+    loop.send('attack', core.ATTACKS.LINE_SHOT)
+    loop.tick()
+    assert loop.snapshot.step == 'result'
+    assert loop.snapshots[0].step == 'attack'
+    assert sum(loop.snapshot.score.values()) == 1
+    assert loop.game.moves == [(core.ATTACKS.LINE_SHOT.index, core.BLOCKS.DIA.index, core.DEFENSES.CUT.index, core.DEFENSES.LINE_HIT.index)]
+
+def test_commands_for_computer_steps_are_dropped():
+    loop = single_player_loop(computer_serves=False)
+    # the computer has attacked before the first snapshot, the human is to block
+    assert loop.snapshot.step == 'block'
+    loop.send('attack', core.ATTACKS.LINE_SHOT)
+    loop.tick()
+    assert loop.snapshot.step == 'block'
+    assert loop.game.current_attacker.attack == core.ATTACKS.CUT
+    loop = single_player_loop(computer_serves=True)
+    assert not loop.apply('block', core.BLOCKS.LINE)
+    assert loop.apply('attack', core.ATTACKS.DIA_HIT)
+    assert not loop.apply('block', core.BLOCKS.LINE)
@@ -0,0 +1,25 @@
+import numpy as np
+
+from core import env
+
+def test_finished_matches_reset_in_the_same_step():
+    n = 16
+    vector_env = env.VectorEnv(n, seed=0, target=5)
+    obs = vector_env.reset()
+    rng = np.random.default_rng(0)
+    points = np.zeros((n, 2), dtype=np.int64)
+    finished = 0
+    for _ in range(200):
+        obs, reward, done, info = vector_env.step(rng.integers(0, vector_env.action_sizes()))
+        points[:, 0] += reward > 0
+        points[:, 1] += reward < 0
+        if done.any():
+            final = info["final_score"][done]
+            assert (final.max(axis=1) >= 5).all() and (np.abs(final[:, 0] - final[:, 1]) >= 2).all()
+            # the final score is every point the match's rewards handed out
+            assert (final == points[done]).all()
+            assert (obs[done, :2] == 0).all()
+            points[done] = 0
+            finished += done.sum()
+        assert (obs[~done, :2] == points[~done]).all()
+    assert finished > n
@@ -0,0 +1,24 @@
+import numpy as np
+import pytest
+
+from core import core, equilibrium
+
+LOOKUP = core.create_defense_lookup_table()
+
+def test_equilibrium_is_not_exploitable():
+    result = equilibrium.equilibrium(LOOKUP)
+    assert equilibrium.exploitability(LOOKUP, result.attack_strategy, result.defense_strategy) == pytest.approx(0, abs=1e-9)
+    payoff = equilibrium.payoff_matrix(LOOKUP)
+    assert equilibrium.expected_defense_win(payoff, result.attack_strategy, result.defense_strategy) == pytest.approx(result.value)
+
+def test_pure_attack_is_exploitable():
+    always_cut = np.eye(len(core.ATTACKS.ATTACK_LIST))[core.ATTACKS.CUT.index]
+    assert equilibrium.exploitability(LOOKUP, attack_strategy=always_cut) > 0.1
+
+def test_exploitability_reuses_the_cached_solve(monkeypatch):
+    equilibrium.equilibrium(LOOKUP)
+    def solve(payoff):
+        raise AssertionError("solved again")
+    monkeypatch.setattr(equilibrium, "solve_equilibrium", solve)
+    result = equilibrium.equilibrium(LOOKUP)
+    equilibrium.exploitability(LOOKUP, result.attack_strategy, result.defense_strategy)
@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+from core import eventlog
+
+def write_records(path, matches):
+    with eventlog.RallyLogWriter(path) as log:
+        for match in matches:
+            log.append(match, 0, 0, 1, 2, 1, 3, 4, 55, 1, 50.0, 40.0, 0, 1)
+
+def test_append_after_truncated_record(tmp_path):
+    path = str(tmp_path / "rallies.log")
+    write_records(path, [0, 1])
+    with open(path, "ab") as f:
+        f.write(b"\x07" * (eventlog.RALLY_RECORD.itemsize // 2))
+    assert eventlog.read_rally_log(path)['match'].tolist() == [0, 1]
+    write_records(path, [2])
+    assert eventlog.read_rally_log(path)['match'].tolist() == [0, 1, 2]
+    assert eventlog.read_rally_log(path)['chance'].tolist() == [55, 55, 55]
+
+def test_record_size_mismatch(tmp_path):
+    path = str(tmp_path / "rallies.log")
+    header = np.array([(eventlog.MAGIC, eventlog.LOG_VERSION, 64)], dtype=eventlog.HEADER)
+    header.tofile(path)
+    with pytest.raises(ValueError, match="64 byte records"):
+        eventlog.read_rally_log(path)
+
+def test_append_after_truncated_header(tmp_path):
+    path = str(tmp_path / "rallies.log")
+    write_records(path, [])
+    with open(path, "r+b") as f:
+        f.truncate(eventlog.HEADER.itemsize // 2)
+    write_records(path, [3])
+    assert eventlog.read_rally_log(path)['match'].tolist() == [3]
@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+
+from core import match
+
+def simulate(p_a, p_b, target, n=100_000, seed=0):
+    # (share of matches a wins, mean rallies) from 0:0 with a serving
+    rng = np.random.default_rng(seed)
+    score = np.zeros((n, 2), dtype=np.int64)
+    server = np.zeros(n, dtype=np.int64)
+    rallies = np.zeros(n, dtype=np.int64)
+    live = np.ones(n, dtype=bool)
+    while live.any():
+        index = np.flatnonzero(live)
+        serve_wins = rng.random(len(index)) < np.where(server[index] == 0, p_a, p_b)
+        winner = np.where(serve_wins, server[index], 1 - server[index])
+        score[index, winner] += 1
+        server[index] = winner
+        rallies[index] += 1
+        live[index] = ~((score[index].max(axis=1) >= target) & (np.abs(score[index, 0] - score[index, 1]) >= 2))
+    return (score[:, 0] > score[:, 1]).mean(), rallies.mean()
+
+@pytest.mark.parametrize("p_a, p_b", [(0.6, 0.45), (0.3, 0.7)])
+def test_exact_tables_match_monte_carlo(p_a, p_b):
+    wins, length = simulate(p_a, p_b, target=7)
+    assert match.match_win_table(p_a, p_b, 7)[0, 0, 0] == pytest.approx(wins, abs=0.01)
+    assert match.expected_length_table(p_a, p_b, 7)[0, 0, 0] == pytest.approx(length, rel=0.01)
+
+def test_symmetric_match_is_even():
+    assert match.match_win_probability(0, 0, 0, 0.5, 0.5) == pytest.approx(0.5)
+    # far past the target the deuce region repeats
+    assert match.match_win_probability(40, 40, 1, 0.6, 0.4) == pytest.approx(match.match_win_probability(20, 20, 1, 0.6, 0.4))
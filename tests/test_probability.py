@@ -0,0 +1,17 @@
+import numpy as np
+
+from core import probability, simulation
+
+def test_kernel_matches_a_seeded_sample():
+    rng = np.random.default_rng(0)
+    kernel = probability.defense_win_kernel()
+    n = 200_000
+    for chance in [0, 5, 25, 55, 75, 90, 100]:
+        sampled = simulation.defense_wins(rng, np.full(n, chance)).mean()
+        # four standard errors of a proportion at most 0.5
+        assert abs(sampled - kernel[chance]) < 4 * 0.5 / np.sqrt(n)
+
+def test_table_maps_chances_to_probabilities():
+    lookup = np.array([[5, 90], [100, 0]], dtype=np.uint8)
+    table = probability.defense_win_table(lookup, probability.NO_NOISE)
+    assert np.allclose(table, (lookup + 1) / 101)
@@ -0,0 +1,32 @@
+from core import cache, core, profiling
+
+def test_ruleset_build_is_profiled(tmp_path):
+    profiler = core.enable_profiling(profiling.Profiler())
+    try:
+        cache.ruleset_for(core.RULES, with_equilibrium=False, cache_dir=str(tmp_path))
+        # a cache hit builds no table
+        cache.ruleset_for(core.RULES, with_equilibrium=False, cache_dir=str(tmp_path))
+    finally:
+        core.disable_profiling()
+    assert profiler.histogram("table_build").count == 1
+    assert "table_build" in profiler.to_json()["histograms"]
+    assert 'beach_chess_phase_seconds_count{phase="table_build"} 1' in profiler.to_prometheus()
+
+def test_disable_restores_the_engine():
+    update = core.Game.update
+    core.enable_profiling(profiling.Profiler())
+    assert core.Game.update is not update
+    core.disable_profiling()
+    assert core.Game.update is update
+
+def test_phases_of_a_rally():
+    profiler = core.enable_profiling(profiling.Profiler())
+    try:
+        game = core.Game(core.Player("a"), core.Player("b"), core.create_defense_lookup_table(), 0, verbose=False)
+        game.coin_toss()
+        for step, action in zip(core.STEPS, [core.ATTACKS.CUT, core.BLOCKS.DIA, core.DEFENSES.CUT, core.DEFENSES.LINE_HIT]):
+            game.update(action, step)
+    finally:
+        core.disable_profiling()
+    counts = {name: histogram.count for name, histogram in profiler.histograms.items()}
+    assert counts == {"table_build": 1, "update": 4, "calc_outcome": 1, "commentary": 1, "score_update": 1}
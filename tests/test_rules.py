@@ -0,0 +1,69 @@
+import json
+
+import numpy as np
+import pytest
+
+from core.rules import RulesetError, compile_rules, load_rules, parse_rules, rules_dict
+
+# the tables the hardcoded builders made before the rulesets, keyed like
+# their meshgrid loops: an attack matching the defense wins, then the block
+# pairs, then the mistake chance
+MATCH_CHANCE = (90, 55)
+MISTAKE_CHANCE = 5
+MATCH, DIRECTION_MATCH = 75, 25
+BEACH_BLOCKS = {(0, 0): DIRECTION_MATCH, (1, 0): MATCH, (2, 0): DIRECTION_MATCH, (3, 1): MATCH, (4, 1): DIRECTION_MATCH, (5, 1): DIRECTION_MATCH}
+CLASSIC_BLOCKS = {(0, 0): DIRECTION_MATCH, (1, 0): MATCH, (2, 0): DIRECTION_MATCH, (3, 1): MATCH, (4, 1): DIRECTION_MATCH}
+
+def baseline_table(n_attacks, n_blocks, n_defenses, block_pairs):
+    table = np.empty((n_attacks, n_blocks, 2, n_defenses), dtype=np.uint8)
+    for index in np.ndindex(table.shape):
+        attack, block, slot, defense = index
+        if attack == defense:
+            table[index] = MATCH_CHANCE[slot]
+        else:
+            table[index] = block_pairs.get((attack, block), MISTAKE_CHANCE)
+    return table
+
+def test_beach_matches_the_core_builder():
+    np.testing.assert_array_equal(compile_rules(load_rules("beach")), baseline_table(7, 3, 7, BEACH_BLOCKS))
+
+def test_classic_matches_the_oocli_builder():
+    np.testing.assert_array_equal(compile_rules(load_rules("classic")), baseline_table(7, 3, 7, CLASSIC_BLOCKS))
+
+def test_simple_matches_the_simplecli_builder_on_its_actions():
+    # simplecli sized its table 8x3x2x8 for five actions, only the named part was ever looked up
+    lookup = compile_rules(load_rules("simple"))
+    np.testing.assert_array_equal(lookup[:5, :2, :, :5], baseline_table(8, 3, 8, CLASSIC_BLOCKS)[:5, :2, :, :5])
+
+def beach_data():
+    return rules_dict(load_rules("beach"))
+
+def broken(change):
+    data = beach_data()
+    change(data)
+    return data
+
+@pytest.mark.parametrize("data, message", [
+    (broken(lambda data: data.update(extra=1)), "unknown fields"),
+    (broken(lambda data: data.pop("blocks")), "missing fields"),
+    (broken(lambda data: data.update(version=2)), "version 2"),
+    (broken(lambda data: data["attacks"].append("cut")), "duplicate names"),
+    (broken(lambda data: data.update(mistake_chance=101)), "mistake_chance"),
+    (broken(lambda data: data.update(defense_match_chance=[90])), "defense slot"),
+    (broken(lambda data: data["block_rules"].append({"attack": "lob", "block": "dia", "kind": "match"})), "unknown attack"),
+    (broken(lambda data: data["block_rules"].append(dict(data["block_rules"][0]))), "more than one block rule"),
+    (broken(lambda data: data.update(block_rules=3)), "must be a list"),
+    ([], "must be an object"),
+])
+def test_parse_rejects(data, message):
+    with pytest.raises(RulesetError, match=message):
+        parse_rules(data)
+
+def test_load_rules_names_the_file(tmp_path):
+    path = tmp_path / "broken.json"
+    path.write_text(json.dumps(broken(lambda data: data.update(block_rules=3))))
+    with pytest.raises(RulesetError, match="broken.json: block_rules must be a list"):
+        load_rules(str(path))
+    path.write_text("{")
+    with pytest.raises(RulesetError, match="broken.json"):
+        load_rules(str(path))
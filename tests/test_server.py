@@ -0,0 +1,76 @@
+import asyncio
+
+from core import server
+
+async def join(port, name):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(server.frame(server.JOIN, name))
+    return reader, writer
+
+async def start_payloads(name):
+    # two clients joining under the same name, the START frame each one gets
+    game_server = server.GameServer(move_timeout=5.0)
+    listener = await game_server.serve("127.0.0.1", 0)
+    port = listener.sockets[0].getsockname()[1]
+    clients = [await join(port, name), await join(port, name)]
+    payloads = []
+    for reader, _ in clients:
+        kind, payload = await server.read_frame(reader)
+        while kind == server.WAITING:
+            kind, payload = await server.read_frame(reader)
+        payloads.append((kind, payload))
+    for _, writer in clients:
+        writer.close()
+    listener.close()
+    await listener.wait_closed()
+    return payloads
+
+async def join_reply(name):
+    game_server = server.GameServer(move_timeout=5.0)
+    listener = await game_server.serve("127.0.0.1", 0)
+    reader, writer = await join(listener.sockets[0].getsockname()[1], name)
+    reply = await server.read_frame(reader)
+    writer.close()
+    listener.close()
+    await listener.wait_closed()
+    return reply
+
+def test_longest_name_clash_fits_start_frame():
+    name = b"x" * server.MAX_NAME_BYTES
+    payloads = asyncio.run(start_payloads(name))
+    assert [kind for kind, _ in payloads] == [server.START, server.START]
+    opponent_names = sorted(payload[2:] for _, payload in payloads)
+    assert opponent_names == [name, name + server.NAME_CLASH_SUFFIX.encode()]
+
+def test_too_long_name_is_refused():
+    assert asyncio.run(join_reply(b"x" * (server.MAX_NAME_BYTES + 1))) == (server.ERROR, bytes([server.ERROR_NAME]))
+    # one invalid byte decodes to a three byte replacement character
+    assert asyncio.run(join_reply(b"x" * (server.MAX_NAME_BYTES - 1) + b"\xff")) == (server.ERROR, bytes([server.ERROR_NAME]))
+
+async def pairing_after_waiting_client_left():
+    game_server = server.GameServer(move_timeout=5.0)
+    listener = await game_server.serve("127.0.0.1", 0)
+    port = listener.sockets[0].getsockname()[1]
+    reader, writer = await join(port, b"gone")
+    assert (await server.read_frame(reader))[0] == server.WAITING
+    writer.close()
+    while game_server.waiting is not None:
+        await asyncio.sleep(0.01)
+    clients = [await join(port, b"a")]
+    # the first joiner after the one who left waits instead of being paired with it
+    assert (await server.read_frame(clients[0][0]))[0] == server.WAITING
+    clients.append(await join(port, b"b"))
+    kinds = []
+    for reader, _ in clients:
+        kind, _ = await server.read_frame(reader)
+        while kind == server.WAITING:
+            kind, _ = await server.read_frame(reader)
+        kinds.append(kind)
+    for _, writer in clients:
+        writer.close()
+    listener.close()
+    await listener.wait_closed()
+    return kinds
+
+def test_waiting_client_that_left_is_not_paired():
+    assert asyncio.run(pairing_after_waiting_client_left()) == [server.START, server.START]
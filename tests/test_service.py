@@ -0,0 +1,38 @@
+import asyncio
+import numpy as np
+import pytest
+
+from core import service
+
+def test_parse_rallies():
+    assert service.parse_rallies([[0, 1, 2, 3], [5, 0, 5, 5]]).tolist() == [[0, 1, 2, 3], [5, 0, 5, 5]]
+    assert service.parse_rallies([]).shape == (0, 4)
+
+@pytest.mark.parametrize("rallies", [
+    [[10**23, 0, 0, 0]],
+    [[2**63, 0, 0, 0]],
+    [[1.7, 0, 0, 0]],
+    [["1", 0, 0, 0]],
+    [[1, 0, 0]],
+    [[1, 0, 0, 0], [1, 0]],
+    [[6, 0, 0, 0]],
+    [[-1, 0, 0, 0]],
+])
+def test_parse_rallies_rejects(rallies):
+    with pytest.raises(service.BadRequest):
+        service.parse_rallies(rallies)
+
+async def post(body):
+    rally_service = service.RallyService(np.zeros((7, 3, 2, 7), dtype=np.uint8), np.random.default_rng(0))
+    listener = await asyncio.start_server(rally_service.handle_connection, "127.0.0.1", 0)
+    reader, writer = await asyncio.open_connection(*listener.sockets[0].getsockname()[:2])
+    writer.write(f"POST /resolve HTTP/1.1\r\nContent-Type: application/json\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body)
+    response = await reader.read()
+    writer.close()
+    listener.close()
+    await listener.wait_closed()
+    return response
+
+def test_huge_action_is_a_bad_request():
+    response = asyncio.run(post(b'{"rallies":[[100000000000000000000000,0,0,0]]}'))
+    assert response.startswith(b"HTTP/1.1 400 ")
@@ -0,0 +1,24 @@
+import numpy as np
+
+from core import core, state
+from test_core import play, random_moves
+
+def test_game_view_plays_like_game():
+    moves = random_moves(np.random.default_rng(5))
+    game = play(7, moves)
+    states = state.MatchState(3)
+    view = states.game(1, core.Player("a"), core.Player("b"), game.lookup, 7, verbose=False)
+    view.coin_toss()
+    rallies = 0
+    while not view.game_finished():
+        attack, block, defense1, defense2 = moves[rallies % len(moves)]
+        view.update(core.ATTACKS.ATTACK_DICT[attack], 'attack')
+        view.update(core.BLOCKS.BLOCK_DICT[block], 'block')
+        view.update(core.DEFENSES.DEFENSE_DICT[defense1], 'defense1')
+        view.update(core.DEFENSES.DEFENSE_DICT[defense2], 'defense2')
+        rallies += 1
+    assert dict(view.score) == game.score
+    assert view.moves == game.moves
+    assert view.current_defender.name == game.current_defender.name
+    # the other rows are untouched
+    assert states.score[[0, 2]].tolist() == [[0, 0], [0, 0]]
@@ -0,0 +1,27 @@
+import json
+
+from core import tournament
+
+HEADER = {"strategies": ["random", "scripted"], "matches": 4, "shard_size": 2, "seed": 1, "rules": "x"}
+RESULT = {"first": "random", "second": "scripted", "shard": 0, "matches": 2, "wins": [1, 1], "points": [30, 30], "rallies": 60, "outcomes": "01"}
+
+def test_truncated_header_starts_over(tmp_path):
+    path = tmp_path / "progress.jsonl"
+    path.write_text(json.dumps(HEADER)[:20])
+    assert tournament.read_progress(str(path)) == (None, [])
+    # a complete header without its newline was still being written
+    path.write_text(json.dumps(HEADER))
+    assert tournament.read_progress(str(path)) == (None, [])
+
+def test_truncated_result_is_dropped(tmp_path):
+    path = tmp_path / "progress.jsonl"
+    path.write_text(json.dumps(HEADER) + "\n" + json.dumps(RESULT) + "\n" + json.dumps(RESULT)[:10])
+    assert tournament.read_progress(str(path)) == (HEADER, [RESULT])
+    assert path.read_text() == json.dumps(HEADER) + "\n" + json.dumps(RESULT) + "\n"
+
+def test_resume_after_truncated_header(tmp_path):
+    (tmp_path / "progress.jsonl").write_text('{"strategies": ["ran')
+    report = tournament.run_tournament(["random", "scripted"], 4, str(tmp_path), shard_size=2, seed=1, processes=1)
+    assert report["played_now"] == 4
+    settings, results = tournament.read_progress(str(tmp_path / "progress.jsonl"))
+    assert settings == report["settings"] and len(results) == 2
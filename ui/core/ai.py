@@ -0,0 +1,196 @@
+import numpy as np
+
+from .core import ATTACKS, BLOCKS, DEFENSES, WINNING_SCORE
+from .equilibrium import DEFENSE_ACTION_SHAPE, equilibrium, payoff_matrix, ruleset_hash
+from .probability import NOISY_ATTACK
+
+DEFENSE_ACTIONS = [
+    (BLOCKS.BLOCK_LIST[block], DEFENSES.DEFENSE_LIST[defense1], DEFENSES.DEFENSE_LIST[defense2])
+    for block, defense1, defense2 in np.ndindex(*DEFENSE_ACTION_SHAPE)
+]
+
+_POLICY_CACHE = {}
+
+def cumulative_policy(policy):
+    # policy[..., action] -> read-only cdf, last column exactly 1 so a
+    # uniform draw in [0, 1) always lands on an action
+    cdf = np.cumsum(policy, axis=-1)
+    cdf /= cdf[..., -1:]
+    cdf[..., -1] = 1.0
+    cdf.setflags(write=False)
+    return cdf
+
+def equilibrium_policy(lookup, model=NOISY_ATTACK):
+    key = ruleset_hash(lookup, model)
+    if key not in _POLICY_CACHE:
+        result = equilibrium(lookup, model)
+        _POLICY_CACHE[key] = (cumulative_policy(result.attack_strategy), cumulative_policy(result.defense_strategy))
+    return _POLICY_CACHE[key]
+
+class PolicyOpponent:
+    # Samples moves from precomputed policy tables. A table is either one
+    # distribution over actions or one per score state, indexed
+    # [own_score, opponent_score, action] with scores clipped to the table.
+    # Tables are shared between opponents, each one only owns its buffer of
+    # pre-drawn uniforms.
+    def __init__(self, attack_cdf, defense_cdf, rng=None, buffer_size=256):
+        self.attack_cdf = attack_cdf
+        self.defense_cdf = defense_cdf
+        self.rng = np.random.default_rng() if rng is None else rng
+        self.uniforms = np.empty(buffer_size)
+        self.position = buffer_size
+
+    def next_uniform(self):
+        if self.position == len(self.uniforms):
+            self.rng.random(out=self.uniforms)
+            self.position = 0
+        self.position += 1
+        return self.uniforms[self.position-1]
+
+    def policy_row(self, cdf, own_score, opponent_score):
+        if cdf.ndim == 1:
+            return cdf
+        last = cdf.shape[0] - 1
+        return cdf[min(own_score, last), min(opponent_score, last)]
+
+    def choose_attack(self, own_score=0, opponent_score=0):
+        row = self.policy_row(self.attack_cdf, own_score, opponent_score)
+        return ATTACKS.ATTACK_LIST[row.searchsorted(self.next_uniform(), side='right')]
+
+    def choose_defense(self, own_score=0, opponent_score=0):
+        # (block, defense1, defense2)
+        row = self.policy_row(self.defense_cdf, own_score, opponent_score)
+        return DEFENSE_ACTIONS[row.searchsorted(self.next_uniform(), side='right')]
+
+    def observe_rally(self, move, attacking, own_score, opponent_score):
+        # Game reports every rally to its computer players: move is the
+        # (attack, block, defense1, defense2) indices, the scores are the
+        # ones the moves were chosen at. Fixed policies ignore it.
+        pass
+
+def sample_actions(cdf, own_score, opponent_score, uniforms):
+    # vectorized PolicyOpponent draw, one action per element of the score arrays
+    if cdf.ndim == 1:
+        return cdf.searchsorted(uniforms, side='right')
+    last = cdf.shape[0] - 1
+    rows = cdf[np.minimum(own_score, last), np.minimum(opponent_score, last)]
+    return (rows <= uniforms[:, None]).sum(axis=1)
+
+# Score contexts of the adaptive opponent: behind by 2+, close, ahead by
+# 2+, each early and late in the match. The late game starts
+# LATE_GAME_MARGIN points before the target score.
+SCORE_CONTEXTS = 6
+LATE_GAME_MARGIN = 4
+
+def score_context(own_score, opponent_score, late_game=WINNING_SCORE-LATE_GAME_MARGIN):
+    lead = own_score - opponent_score
+    context = 0 if lead <= -2 else 1 if lead < 2 else 2
+    return context + 3 if max(own_score, opponent_score) >= late_game else context
+
+class AdaptiveOpponent(PolicyOpponent):
+    # Models the opponent by exponentially decayed counts of its attacks and
+    # defender actions per score context. With probability exploit times the
+    # model's confidence it best-responds to the predicted mix against the
+    # payoff matrix, otherwise it plays the equilibrium policy it inherits,
+    # so it can never be exploited by much more than the equilibrium can.
+    # Decay is done by growing the weight of new observations instead of
+    # shrinking the old ones, an update touches one count; choosing a move
+    # is one product with the payoff matrix into a preallocated buffer.
+    # target is the score the games it plays are won at.
+    def __init__(self, payoff, attack_cdf, defense_cdf, rng=None, decay=0.9, exploit=0.8, prior=4.0, buffer_size=256, target=WINNING_SCORE):
+        super().__init__(attack_cdf, defense_cdf, rng, buffer_size)
+        self.late_game = target - LATE_GAME_MARGIN
+        self.payoff = np.ascontiguousarray(payoff, dtype=np.float64)
+        self.decay = decay
+        self.exploit = exploit
+        self.prior = prior
+        # the counts start at the equilibrium mix with `prior` observations of weight
+        attack_prior = np.diff(attack_cdf, prepend=0.0)
+        defense_prior = np.diff(defense_cdf, prepend=0.0)
+        self.attack_counts = np.tile(prior * attack_prior, (SCORE_CONTEXTS, 1))
+        self.defense_counts = np.tile(prior * defense_prior, (SCORE_CONTEXTS, 1))
+        self.attack_totals = np.full(SCORE_CONTEXTS, prior)
+        self.defense_totals = np.full(SCORE_CONTEXTS, prior)
+        self.attack_weights = np.ones(SCORE_CONTEXTS)
+        self.defense_weights = np.ones(SCORE_CONTEXTS)
+        # decayed number of real observations, drives the confidence
+        self.attack_seen = np.zeros(SCORE_CONTEXTS)
+        self.defense_seen = np.zeros(SCORE_CONTEXTS)
+        self.attack_values = np.empty(self.payoff.shape[0])
+        self.defense_values = np.empty(self.payoff.shape[1])
+
+    def record(self, counts, totals, weights, seen, context, action):
+        weight = weights[context] / self.decay
+        if weight > 1e12:
+            # rescale the context before the weights overflow, once every few hundred updates
+            counts[context] /= weight
+            totals[context] /= weight
+            weight = 1.0
+        weights[context] = weight
+        counts[context, action] += weight
+        totals[context] += weight
+        seen[context] = seen[context] * self.decay + 1
+
+    def observe_rally(self, move, attacking, own_score, opponent_score):
+        attack, block, defense1, defense2 = move
+        context = score_context(own_score, opponent_score, self.late_game)
+        if attacking:
+            action = (block * DEFENSE_ACTION_SHAPE[1] + defense1) * DEFENSE_ACTION_SHAPE[2] + defense2
+            self.record(self.defense_counts, self.defense_totals, self.defense_weights, self.defense_seen, context, action)
+        else:
+            self.record(self.attack_counts, self.attack_totals, self.attack_weights, self.attack_seen, context, attack)
+
+    def exploiting(self, seen):
+        confidence = seen / (seen + self.prior)
+        return self.next_uniform() < self.exploit * confidence
+
+    def choose_attack(self, own_score=0, opponent_score=0):
+        context = score_context(own_score, opponent_score, self.late_game)
+        if not self.exploiting(self.defense_seen[context]):
+            return super().choose_attack(own_score, opponent_score)
+        # P(defense wins) of each attack against the predicted defense mix, unnormalized
+        np.dot(self.payoff, self.defense_counts[context], out=self.attack_values)
+        return ATTACKS.ATTACK_LIST[self.attack_values.argmin()]
+
+    def choose_defense(self, own_score=0, opponent_score=0):
+        context = score_context(own_score, opponent_score, self.late_game)
+        if not self.exploiting(self.attack_seen[context]):
+            return super().choose_defense(own_score, opponent_score)
+        np.dot(self.attack_counts[context], self.payoff, out=self.defense_values)
+        return DEFENSE_ACTIONS[self.defense_values.argmax()]
+
+class ScriptedOpponent:
+    # Cycles through fixed attacks and (block, defense1, defense2) moves, a
+    # stand-in for a player with strong habits
+    def __init__(self, attacks, defenses):
+        self.attacks = attacks
+        self.defenses = defenses
+        self.attack_turn = 0
+        self.defense_turn = 0
+
+    def choose_attack(self, own_score=0, opponent_score=0):
+        self.attack_turn += 1
+        return self.attacks[(self.attack_turn-1) % len(self.attacks)]
+
+    def choose_defense(self, own_score=0, opponent_score=0):
+        self.defense_turn += 1
+        return self.defenses[(self.defense_turn-1) % len(self.defenses)]
+
+    def observe_rally(self, move, attacking, own_score, opponent_score):
+        pass
+
+def equilibrium_opponent(lookup, model=NOISY_ATTACK, rng=None):
+    attack_cdf, defense_cdf = equilibrium_policy(lookup, model)
+    return PolicyOpponent(attack_cdf, defense_cdf, rng)
+
+def adaptive_opponent(lookup, model=NOISY_ATTACK, rng=None, **options):
+    attack_cdf, defense_cdf = equilibrium_policy(lookup, model)
+    return AdaptiveOpponent(payoff_matrix(lookup, model), attack_cdf, defense_cdf, rng, **options)
+
+def ruleset_adaptive_opponent(ruleset, rng=None, **options):
+    # AdaptiveOpponent from a compiled ruleset, payoff and equilibrium included
+    return AdaptiveOpponent(ruleset.payoff, cumulative_policy(ruleset.attack_strategy), cumulative_policy(ruleset.defense_strategy), rng, **options)
+
+def ruleset_opponent(ruleset, rng=None):
+    # opponent straight from the strategies of a cached compiled ruleset
+    return PolicyOpponent(cumulative_policy(ruleset.attack_strategy), cumulative_policy(ruleset.defense_strategy), rng)
@@ -0,0 +1,142 @@
+import numpy as np
+
+from .ai import DEFENSE_ACTIONS, PolicyOpponent, cumulative_policy
+from .core import ATTACKS, BLOCKS, DEFENSES, STEPS, Game, Player, spawn_seeds
+from .eventlog import RALLY_RECORD, RallyBuffer, iter_chunks
+
+# Grouped counts over the lookup table's [attack, block, slot, defense]
+# space and over whole defender actions [attack, block, defense1, defense2].
+SLOT_SHAPE = (len(ATTACKS.ATTACK_LIST), len(BLOCKS.BLOCK_LIST), 2, len(DEFENSES.DEFENSE_LIST))
+PAIR_SHAPE = (len(ATTACKS.ATTACK_LIST), len(BLOCKS.BLOCK_LIST), len(DEFENSES.DEFENSE_LIST), len(DEFENSES.DEFENSE_LIST))
+
+# bins of the per-match histograms, the last bin also counts everything above it
+HISTOGRAM_SIZE = 128
+
+def histogram(values):
+    return np.bincount(np.clip(values, 0, HISTOGRAM_SIZE-1), minlength=HISTOGRAM_SIZE)
+
+class RallyStats:
+    # Accumulates eventlog records chunk by chunk. Rally counts are added
+    # per chunk; the rallies of the last match in a chunk are held back
+    # until the match is complete, so a match's records must be contiguous
+    # (as Game logs them) and finish() has to be called after the last chunk.
+    def __init__(self):
+        self.slot_rallies = np.zeros(np.prod(SLOT_SHAPE), dtype=np.int64)
+        self.slot_defended = np.zeros(np.prod(SLOT_SHAPE), dtype=np.int64)
+        self.pair_rallies = np.zeros(np.prod(PAIR_SHAPE), dtype=np.int64)
+        self.pair_defended = np.zeros(np.prod(PAIR_SHAPE), dtype=np.int64)
+        # rallies per match, final point difference, most points the winner trailed by
+        self.match_lengths = np.zeros(HISTOGRAM_SIZE, dtype=np.int64)
+        self.margins = np.zeros(HISTOGRAM_SIZE, dtype=np.int64)
+        self.winner_deficits = np.zeros(HISTOGRAM_SIZE, dtype=np.int64)
+        self.carry = np.zeros(0, dtype=RALLY_RECORD)
+
+    def update(self, records):
+        records = np.asarray(records)
+        defended = records['winner'] == records['defender']
+        attack, block = records['attack'], records['block']
+        for slot, field in enumerate(['defense1', 'defense2']):
+            index = np.ravel_multi_index((attack, block, slot, records[field]), SLOT_SHAPE)
+            self.slot_rallies += np.bincount(index, minlength=len(self.slot_rallies))
+            self.slot_defended += np.bincount(index[defended], minlength=len(self.slot_defended))
+        index = np.ravel_multi_index((attack, block, records['defense1'], records['defense2']), PAIR_SHAPE)
+        self.pair_rallies += np.bincount(index, minlength=len(self.pair_rallies))
+        self.pair_defended += np.bincount(index[defended], minlength=len(self.pair_defended))
+
+        if len(self.carry):
+            records = np.concatenate([self.carry, records])
+        match = records['match']
+        starts = np.flatnonzero(match[1:] != match[:-1]) + 1
+        last_start = starts[-1] if len(starts) else 0
+        self.add_matches(records[:last_start])
+        self.carry = records[last_start:].copy()
+
+    def finish(self):
+        self.add_matches(self.carry)
+        self.carry = self.carry[:0]
+        return self
+
+    def add_matches(self, records):
+        if len(records) == 0:
+            return
+        match = records['match']
+        starts = np.concatenate([[0], np.flatnonzero(match[1:] != match[:-1]) + 1])
+        ends = np.concatenate([starts[1:], [len(records)]])
+        margin = records['points0'].astype(np.int32) - records['points1']
+        final = margin[ends-1]
+        trailing0 = -np.minimum.reduceat(margin, starts)
+        trailing1 = np.maximum.reduceat(margin, starts)
+        deficit = np.maximum(np.where(final > 0, trailing0, trailing1), 0)
+        self.match_lengths += histogram(ends - starts)
+        self.margins += histogram(np.abs(final))
+        self.winner_deficits += histogram(deficit)
+
+    def merge(self, other):
+        # combines the totals of stats collected in parallel, both finished
+        for name in ['slot_rallies', 'slot_defended', 'pair_rallies', 'pair_defended', 'match_lengths', 'margins', 'winner_deficits']:
+            getattr(self, name).__iadd__(getattr(other, name))
+        return self
+
+    @property
+    def matches(self):
+        return int(self.match_lengths.sum())
+
+    @property
+    def rallies(self):
+        return int(self.pair_rallies.sum())
+
+    def slot_success_rate(self):
+        # attack success rate [attack, block, slot, defense], nan where never played
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return (1 - self.slot_defended / self.slot_rallies).reshape(SLOT_SHAPE)
+
+    def pair_success_rate(self):
+        # attack success rate [attack, block, defense1, defense2], nan where never played
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return (1 - self.pair_defended / self.pair_rallies).reshape(PAIR_SHAPE)
+
+    def comeback_frequency(self, deficit=5):
+        # share of matches won by a player who trailed by at least `deficit` points
+        return self.winner_deficits[deficit:].sum() / max(self.matches, 1)
+
+class StatsCollector(RallyBuffer):
+    # feeds every full buffer of a running Game straight into a RallyStats
+    def __init__(self, stats=None, buffer_size=65536):
+        super().__init__(buffer_size)
+        self.stats = RallyStats() if stats is None else stats
+
+    def write(self, records):
+        self.stats.update(records)
+
+    def close(self):
+        self.flush()
+        self.stats.finish()
+
+def log_stats(log, chunk_size=1 << 20):
+    # RallyStats of an eventlog.read_rally_log mapping, chunk_size records in memory at a time
+    stats = RallyStats()
+    for chunk in iter_chunks(log, chunk_size):
+        stats.update(chunk)
+    return stats.finish()
+
+def uniform_opponent(rng=None):
+    return PolicyOpponent(
+        cumulative_policy(np.full(len(ATTACKS.ATTACK_LIST), 1.0)),
+        cumulative_policy(np.full(len(DEFENSE_ACTIONS), 1.0)),
+        rng,
+    )
+
+def play_matches(n, lookup, seed=None, opponent=uniform_opponent, buffer_size=65536):
+    # Headless core.Game matches between two computer players built by
+    # opponent(rng), collected into a RallyStats.
+    seeds = spawn_seeds(seed, n+1)
+    rng = np.random.default_rng(seeds[n])
+    players = [Player("player1", opponent(rng)), Player("player2", opponent(rng))]
+    with StatsCollector(buffer_size=buffer_size) as collector:
+        for match in range(n):
+            game = Game(players[0], players[1], lookup, seeds[match], verbose=False, log=collector, match_id=match)
+            game.coin_toss()
+            while not game.game_finished():
+                for step in STEPS[:-1]:
+                    game.update(game.computer_action(step), step)
+    return collector.stats
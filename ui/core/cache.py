@@ -0,0 +1,75 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from collections import namedtuple
+from functools import partial
+import numpy as np
+
+from .core import create_defense_lookup_table
+from .equilibrium import payoff_matrix, solve_equilibrium
+from .probability import NOISY_ATTACK, defense_win_table
+from .rules import rules_hash
+
+# Bump whenever the way tables are compiled changes, the constants alone
+# would not notice.
+CACHE_VERSION = 1
+
+CACHE_DIR = os.environ.get("BEACH_CHESS_CACHE", os.path.join(os.path.expanduser("~"), ".cache", "beach-chess"))
+
+Ruleset = namedtuple('Ruleset', ['key', 'lookup', 'defense_win', 'payoff', 'attack_strategy', 'defense_strategy', 'value'])
+
+TABLES = ['lookup', 'defense_win', 'payoff', 'attack_strategy', 'defense_strategy', 'value']
+
+def ruleset_key(rules, model=NOISY_ATTACK, with_equilibrium=True):
+    # the ruleset's rules_hash identity plus what is compiled from it and how
+    digest = hashlib.sha1()
+    digest.update(repr((CACHE_VERSION, model, with_equilibrium, rules_hash(rules))).encode())
+    return digest.hexdigest()
+
+def compile_ruleset(build_lookup, model=NOISY_ATTACK, with_equilibrium=True):
+    tables = {"lookup": build_lookup()}
+    tables["defense_win"] = defense_win_table(tables["lookup"], model)
+    if with_equilibrium:
+        tables["payoff"] = payoff_matrix(tables["lookup"], model)
+        result = solve_equilibrium(tables["payoff"])
+        tables["attack_strategy"] = result.attack_strategy
+        tables["defense_strategy"] = result.defense_strategy
+        tables["value"] = np.array([result.value])
+    return tables
+
+def write_ruleset(path, tables):
+    # written next to the final directory and renamed into place, so a
+    # concurrent reader never sees half an artifact
+    parent = os.path.dirname(path)
+    os.makedirs(parent, exist_ok=True)
+    tmp = tempfile.mkdtemp(dir=parent)
+    for name, table in tables.items():
+        np.save(os.path.join(tmp, f"{name}.npy"), np.ascontiguousarray(table))
+    try:
+        os.rename(tmp, path)
+    except OSError:
+        # another process got there first
+        shutil.rmtree(tmp, ignore_errors=True)
+
+def read_ruleset(key, path):
+    tables = {}
+    for name in TABLES:
+        table_path = os.path.join(path, f"{name}.npy")
+        # plain ndarray views of the mapping, memmap subclass overhead stays out of the hot paths
+        tables[name] = np.load(table_path, mmap_mode='r').view(np.ndarray) if os.path.exists(table_path) else None
+    if tables["value"] is not None:
+        tables["value"] = float(tables["value"][0])
+    return Ruleset(key, **tables)
+
+def load_ruleset(key, build_lookup, model=NOISY_ATTACK, with_equilibrium=True, cache_dir=None):
+    # Compiled tables are memory-mapped read-only from the cache, so forked
+    # workers share the pages. The artifact is built on the first miss.
+    path = os.path.join(CACHE_DIR if cache_dir is None else cache_dir, key)
+    if not os.path.isdir(path):
+        write_ruleset(path, compile_ruleset(build_lookup, model, with_equilibrium))
+    return read_ruleset(key, path)
+
+def ruleset_for(rules, model=NOISY_ATTACK, with_equilibrium=True, cache_dir=None):
+    # load_ruleset for a rules.RuleSpec, built through core so a cache miss shows up as a profiled table_build
+    return load_ruleset(ruleset_key(rules, model, with_equilibrium), partial(create_defense_lookup_table, rules), model, with_equilibrium, cache_dir)
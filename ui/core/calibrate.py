@@ -0,0 +1,134 @@
+import argparse
+import itertools
+import json
+import os
+import tempfile
+from functools import partial
+from multiprocessing import Pool
+import numpy as np
+
+from .cache import CACHE_DIR, ruleset_for, ruleset_key
+from .core import DEFAULT_RULES
+from .match import expected_match_length
+from .probability import NOISY_ATTACK
+from .rules import load_rules, parse_rules, rules_dict
+
+# Sweep parameters and where they live in the rules format. Every grid
+# point is compiled into a ruleset and scored by
+#   value    P(defense wins a rally) at the equilibrium
+#   entropy  bits of the equilibrium attack choice, log2(6) when uniform
+#   length   expected rallies per match between equilibrium players
+PARAMETERS = {
+    "block_match": ("block_chance", "match"),
+    "block_direction_match": ("block_chance", "direction_match"),
+    "match_chance_first": ("defense_match_chance", 0),
+    "match_chance_second": ("defense_match_chance", 1),
+    "mistake_chance": ("mistake_chance", None),
+}
+
+METRICS = ["value", "entropy", "length"]
+
+def parse_range(text):
+    # "start:stop:step" with stop included, or a single value
+    parts = [int(part) for part in text.split(":")]
+    if len(parts) == 1:
+        return [parts[0]]
+    start, stop = parts[:2]
+    step = parts[2] if len(parts) == 3 else 1
+    return list(range(start, stop+1, step))
+
+def rules_for(point, base):
+    # a copy of the base RuleSpec with the grid point's chances
+    data = rules_dict(base)
+    for name, value in point.items():
+        group, key = PARAMETERS[name]
+        if key is None:
+            data[group] = value
+        else:
+            data[group][key] = value
+    return parse_rules(data)
+
+def grid(ranges):
+    names = sorted(ranges)
+    for values in itertools.product(*[ranges[name] for name in names]):
+        yield dict(zip(names, values))
+
+def entropy(strategy):
+    strategy = np.asarray(strategy)
+    strategy = strategy[strategy > 0]
+    return float(-(strategy * np.log2(strategy)).sum())
+
+def evaluate(point, base, model=NOISY_ATTACK, cache_dir=None):
+    ruleset = ruleset_for(rules_for(point, base), model, True, cache_dir)
+    # the defender serves and both sides play the equilibrium, so both win their serve with the value
+    return {
+        "point": point,
+        "key": ruleset.key,
+        "value": ruleset.value,
+        "entropy": entropy(ruleset.attack_strategy),
+        "length": expected_match_length(ruleset.value, ruleset.value),
+    }
+
+def result_path(results_dir, key):
+    return os.path.join(results_dir, f"{key}.json")
+
+def write_result(results_dir, result):
+    # renamed into place, an interrupted sweep never leaves half a result behind
+    fd, tmp = tempfile.mkstemp(dir=results_dir, suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        json.dump(result, f, sort_keys=True)
+    os.replace(tmp, result_path(results_dir, result["key"]))
+
+def sweep(ranges, base=None, model=NOISY_ATTACK, processes=None, cache_dir=None, results_dir=None):
+    # Evaluates every grid point in a process pool. Results are stored per
+    # ruleset key, so rerunning an interrupted sweep only evaluates what is
+    # missing, and overlapping sweeps share their points.
+    base = load_rules(DEFAULT_RULES) if base is None else base
+    cache_dir = CACHE_DIR if cache_dir is None else cache_dir
+    results_dir = os.path.join(cache_dir, "sweeps") if results_dir is None else results_dir
+    os.makedirs(results_dir, exist_ok=True)
+    results = []
+    todo = []
+    for point in grid(ranges):
+        path = result_path(results_dir, ruleset_key(rules_for(point, base), model, True))
+        if os.path.exists(path):
+            with open(path) as f:
+                results.append(json.load(f))
+        else:
+            todo.append(point)
+    if todo:
+        with Pool(processes) as pool:
+            for result in pool.imap_unordered(partial(evaluate, base=base, model=model, cache_dir=cache_dir), todo):
+                write_result(results_dir, result)
+                results.append(result)
+    return results
+
+def distance(result, targets):
+    # summed squared relative error over the targeted metrics, absolute for a target of 0
+    return sum(((result[metric] - target) / (target or 1))**2 for metric, target in targets.items())
+
+def search(results, targets, top=10):
+    return sorted(results, key=lambda result: distance(result, targets))[:top]
+
+def main():
+    parser = argparse.ArgumentParser(description="sweep the rule constants and rank them against target metrics")
+    for name in PARAMETERS:
+        parser.add_argument(f"--{name.replace('_', '-')}", type=parse_range, metavar="START:STOP[:STEP]")
+    for metric in METRICS:
+        parser.add_argument(f"--target-{metric}", type=float)
+    parser.add_argument("--rules", default=DEFAULT_RULES, help="ruleset name or file the sweep starts from")
+    parser.add_argument("--processes", type=int)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    ranges = {name: getattr(args, name) for name in PARAMETERS if getattr(args, name) is not None}
+    targets = {metric: getattr(args, f"target_{metric}") for metric in METRICS if getattr(args, f"target_{metric}") is not None}
+    results = sweep(ranges, load_rules(args.rules), processes=args.processes)
+    ranked = search(results, targets, args.top) if targets else results[:args.top]
+    for result in ranked:
+        if targets:
+            result["distance"] = distance(result, targets)
+        print(json.dumps(result, sort_keys=True))
+
+if __name__ == '__main__':
+    main()
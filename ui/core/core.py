@@ -1,10 +1,16 @@
 import os
+import sys
 from collections import namedtuple
 import numpy as np
 
-BLOCK_CHANCE = {"match": 75, "direction_match": 25}
-ATTACK_DEFENSE_MATCH_CHANCE = {0: 90, 1: 55}
-GENERAL_ATTACK_MISTAKE_CHANCE = 5
+from .profiling import PROFILER, timed
+from .rules import compile_rules, load_rules, require_actions
+
+WINNING_SCORE = 21
+DEFAULT_RULES = "beach"
+
+# the order Game.update expects its steps in, 'result' waits for a confirmation
+STEPS = ['attack', 'block', 'defense1', 'defense2', 'result']
 
 SINGLE_PLAYER_MODE = "single-player"
 MULTI_PLAYER_MODE = "mutli-player"
@@ -90,8 +96,9 @@ def ask_input_until_plausible(prompt, plausible):
     return value
 
 class Player:
-    def __init__(self, name):
+    def __init__(self, name, computer=None):
         self.name = name
+        self.computer = computer
         self.attack = Attack(-1, "")
         self.block = Block(-1, "")
         self.defense1 = Defense(-1, "")
@@ -125,20 +132,57 @@ class Player:
     def get_defense(self):
         return [self.defense1, self.defense2]
 
+class RandomStream:
+    # Owns a numpy Generator and hands out the rally noise from buffers drawn
+    # in bulk. The same seed, buffer size and sequence of calls give
+    # bit-identical draws. coin() reads the Generator directly, so a coin
+    # tossed between two refills shifts every later buffer; Game only tosses
+    # before the first rally, where no refill has happened yet.
+    def __init__(self, seed=None, buffer_size=1024):
+        self.seed_sequence = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+        self.rng = np.random.default_rng(self.seed_sequence)
+        self.buffer_size = buffer_size
+        self.position = buffer_size
+
+    def refill(self):
+        self.noise = self.rng.uniform(low=0.95, high=1.05, size=(self.buffer_size, 2)).tolist()
+        self.rolls = self.rng.integers(0, 101, size=self.buffer_size).tolist()
+        self.position = 0
+
+    def rally_draw(self):
+        # (defense noise, attack roll, attack noise)
+        if self.position == self.buffer_size:
+            self.refill()
+        defense_noise, attack_noise = self.noise[self.position]
+        roll = self.rolls[self.position]
+        self.position += 1
+        return defense_noise, roll, attack_noise
+
+    def coin(self):
+        return int(self.rng.integers(0, 2))
+
+def spawn_seeds(seed, n):
+    # independent seeds for n games or workers, each one reproducible
+    return np.random.SeedSequence(seed).spawn(n)
+
 class Rally:
-    def __init__(self, attacker: Player, defender: Player, lookup):
+    def __init__(self, attacker: Player, defender: Player, lookup, random=None, verbose=True):
         self.attacker = attacker
         self.defender = defender
         self.lookup = lookup
+        self.random = RandomStream() if random is None else random
+        self.verbose = verbose
         self.defense_chance = 0
         self.attack_score = 0
         self.stats = ""
         self.comment = ""
 
     def print_rally(self):
-        print(f"{Font.BOLD}attack:{Font.END} {self.attacker.get_attack().name}\t {Font.BOLD}block:{Font.END} {self.defender.get_block().name}\t {Font.BOLD}defenses:{Font.END} {self.defender.get_defense()[0].name}, {self.defender.get_defense()[1].name}")
+        if self.verbose:
+            print(f"{Font.BOLD}attack:{Font.END} {self.attacker.get_attack().name}\t {Font.BOLD}block:{Font.END} {self.defender.get_block().name}\t {Font.BOLD}defenses:{Font.END} {self.defender.get_defense()[0].name}, {self.defender.get_defense()[1].name}")
         self.stats = f"defence score: {self.defense_score:.2f}, attack score: {self.attack_score:.2f}"
-        print(self.stats)
+        if self.verbose:
+            print(self.stats)
         if self.attack_score <= 5 and self.defense_score <= 5:
             comment = DEFENSE_MADE_TEXT_LOOKUP[5]
         elif self.attack_score <= self.defense_score:
@@ -151,35 +195,54 @@ class Rally:
         defenses = self.defender.get_defense()
         block = self.defender.get_block()
         attack = self.attacker.get_attack()
-        defense_chances = np.array([self.lookup[(attack.index, block.index, 0, defenses[0].index)], self.lookup[(attack.index, block.index, 1, defenses[1].index)]])
-        self.defense_chance = np.max(defense_chances)
-        self.defense_score = self.defense_chance * np.random.uniform(low=0.95, high=1.05, size=1)[0]
-        self.attack_score = np.random.randint(0, 101) * np.random.uniform(low=0.95, high=1.05, size=1)[0]
+        self.defense_chance = int(defense_chances(self.lookup, attack.index, block.index, defenses[0].index, defenses[1].index))
+        defense_noise, attack_roll, attack_noise = self.random.rally_draw()
+        self.defense_score = self.defense_chance * defense_noise
+        self.attack_score = attack_roll * attack_noise
         self.comment = self.print_rally()
         return (self.defender, self.attacker) if self.attack_score <= self.defense_score else (self.attacker, self.defender)
 
 class Game:
-    def __init__(self, player1: Player, player2: Player, lookup):
+    def __init__(self, player1: Player, player2: Player, lookup, seed=None, verbose=True, log=None, match_id=0):
         self.players = [player1, player2]
         self.current_defender = None
         self.current_attacker = None
         self.score = {player1.name: 0, player2.name: 0}
         self.lookup = lookup
         self.current_comment = ""
+        self.random = RandomStream(seed)
+        self.verbose = verbose
+        self.moves = []
+        # an eventlog.RallyLogWriter, records every rally under match_id
+        self.log = log
+        self.match_id = match_id
 
     def coin_toss(self):
-        coin = np.random.randint(0,2)
+        coin = self.random.coin()
         self.current_defender = self.players[coin]
         self.current_attacker = self.players[abs(coin-1)]
-        print(f"{self.players[coin].name} serves!")
+        if self.verbose:
+            print(f"{self.players[coin].name} serves!")
         return f"{self.players[coin].name} serves!"
 
     def play_rally(self):
-        rally = Rally(self.current_attacker, self.current_defender, self.lookup)
+        attacker, defender = self.current_attacker, self.current_defender
+        rally = Rally(attacker, defender, self.lookup, self.random, self.verbose)
+        move = (attacker.get_attack().index, defender.get_block().index, defender.defense1.index, defender.defense2.index)
+        self.moves.append(move)
+        if attacker.computer is not None:
+            attacker.computer.observe_rally(move, True, self.score[attacker.name], self.score[defender.name])
+        if defender.computer is not None:
+            defender.computer.observe_rally(move, False, self.score[defender.name], self.score[attacker.name])
         self.current_defender, self.current_attacker = rally.calc_outcome()
-        self.score[self.current_defender.name] += 1
+        self.award_point(self.current_defender)
+        if self.log is not None:
+            self.log.log_rally(self, rally, self.current_defender)
         return (rally.comment, rally.stats)
 
+    def award_point(self, player):
+        self.score[player.name] += 1
+
     def update(self, action, t):
         if t == 'attack':
             self.current_attacker.set_attack(action)
@@ -192,12 +255,38 @@ class Game:
             return self.play_rally()
         return ("", "")
 
+    def computer_action(self, t):
+        # the action a computer player takes at update step t, None if a human is to move
+        if t == 'attack':
+            player, opponent = self.current_attacker, self.current_defender
+            if player.computer is None:
+                return None
+            return player.computer.choose_attack(self.score[player.name], self.score[opponent.name])
+        player, opponent = self.current_defender, self.current_attacker
+        if player.computer is None:
+            return None
+        if t == 'block':
+            block, defense1, defense2 = player.computer.choose_defense(self.score[player.name], self.score[opponent.name])
+            player.set_defense(defense1, defense2)
+            return block
+        if t == 'defense1':
+            return player.defense1
+        if t == 'defense2':
+            return player.defense2
+        return None
+
     def choose_attack(self):
+        if self.current_attacker.computer is not None:
+            self.current_attacker.set_attack(self.computer_action('attack'))
+            return
         chosen_attack = ask_input_until_plausible(f"{self.current_attacker.name}, choose an attack ({action_list_to_string(ATTACKS.ATTACK_LIST)}): ", len(ATTACKS.ATTACK_LIST))
         os.system('clear')
         self.current_attacker.set_attack(ATTACKS.ATTACK_DICT[chosen_attack])
 
     def choose_defense(self):
+        if self.current_defender.computer is not None:
+            self.current_defender.set_block(self.computer_action('block'))
+            return
         chosen_block = ask_input_until_plausible(f"{self.current_defender.name}, choose a block ({action_list_to_string(BLOCKS.BLOCK_LIST)}): ", len(BLOCKS.BLOCK_LIST))
         chosen_defense1 = ask_input_until_plausible(f"{self.current_defender.name}, choose the first defense ({action_list_to_string(DEFENSES.DEFENSE_LIST)}): ", len(DEFENSES.DEFENSE_LIST))
         chosen_defense2 = ask_input_until_plausible(f"{self.current_defender.name}, choose the second defense ({action_list_to_string(DEFENSES.DEFENSE_LIST)}): ", len(DEFENSES.DEFENSE_LIST))
@@ -207,7 +296,7 @@ class Game:
 
     def game_finished(self):
         points = list(self.score.values())
-        if points[0] < 21 and points[1] < 21:
+        if points[0] < WINNING_SCORE and points[1] < WINNING_SCORE:
             return False
         if abs(points[0] - points[1]) < 2:
             return False
@@ -221,31 +310,58 @@ class Game:
         print(f"{Font.GREEN}{self.score}{Font.END}")
         input("Next rally...")
 
-def create_defense_lookup_table():
-    attack = np.arange(0, len(ATTACKS.ATTACK_LIST)+1, 1)
-    block = np.arange(0, len(BLOCKS.BLOCK_LIST)+1, 1)
-    defence_choice = np.arange(0, 2, 1)
-    defense = np.arange(0, len(DEFENSES.DEFENSE_LIST)+1, 1)
-
-    mesh = np.array(np.meshgrid(attack, block, defence_choice, defense))
-    combinations = mesh.T.reshape(-1, 4)
-    lookup = {}
-    for comb in combinations:
-        if comb[0] == comb[3]:
-            lookup[tuple(comb.tolist())] = ATTACK_DEFENSE_MATCH_CHANCE[comb[2]]
-        elif comb[0] == 0 and comb[1] == 0: # cut vs dia block
-            lookup[tuple(comb.tolist())] = BLOCK_CHANCE["direction_match"]
-        elif comb[0] == 1 and comb[1] == 0: # dia hit vs dia block
-            lookup[tuple(comb.tolist())] = BLOCK_CHANCE["match"]
-        elif comb[0] == 2 and comb[1] == 0: # dia shot vs dia block
-            lookup[tuple(comb.tolist())] = BLOCK_CHANCE["direction_match"]
-        elif comb[0] == 3 and comb[1] == 1: # line hit vs line block
-            lookup[tuple(comb.tolist())] = BLOCK_CHANCE["match"]
-        elif comb[0] == 4 and comb[1] == 1: # line shot vs line block
-            lookup[tuple(comb.tolist())] = BLOCK_CHANCE["direction_match"]
-        elif comb[0] == 5 and comb[1] == 1: # spob vs line block
-            lookup[tuple(comb.tolist())] = BLOCK_CHANCE["direction_match"]
-        else:
-            lookup[tuple(comb.tolist())] = GENERAL_ATTACK_MISTAKE_CHANCE
-
-    return lookup
+def replay(player1: Player, player2: Player, lookup, seed, moves):
+    # rebuilds a game from its seed (Game.random.seed_sequence) and Game.moves
+    game = Game(player1, player2, lookup, seed)
+    game.coin_toss()
+    for attack, block, defense1, defense2 in moves:
+        game.current_attacker.set_attack(ATTACKS.ATTACK_DICT[attack])
+        game.current_defender.set_block(BLOCKS.BLOCK_DICT[block])
+        game.current_defender.set_defense(DEFENSES.DEFENSE_DICT[defense1], DEFENSES.DEFENSE_DICT[defense2])
+        game.play_rally()
+    return game
+
+# the outcome rules live in rulesets/, see core.rules
+RULES = load_rules(DEFAULT_RULES)
+require_actions(RULES, [a.name for a in ATTACKS.ATTACK_LIST], [b.name for b in BLOCKS.BLOCK_LIST], [d.name for d in DEFENSES.DEFENSE_LIST])
+
+def create_defense_lookup_table(rules=None):
+    # dense table indexed [attack, block, defender_slot, defense] of a
+    # rules.RuleSpec, this module's RULES by default
+    return compile_rules(RULES if rules is None else rules)
+
+def defense_chances(lookup, attack, block, defense1, defense2):
+    # works on scalars as well as whole arrays of choices
+    return np.maximum(lookup[attack, block, 0, defense1], lookup[attack, block, 1, defense2])
+
+# Opt-in timing of the engine phases, reported to a profiling.Profiler
+# under the phase names. Enabling swaps the functions below for timed
+# wrappers and disabling puts the originals back, so a disabled engine runs
+# exactly the code it always did. The table build is timed at compile_rules,
+# which create_defense_lookup_table looks up at call time, so it counts no
+# matter how a caller imported create_defense_lookup_table; cache.ruleset_for
+# builds through it too, a cache hit builds nothing. Game.update includes the
+# rally it plays on 'defense2'.
+PROFILED_PHASES = [
+    ("table_build", sys.modules[__name__], "compile_rules"),
+    ("update", Game, "update"),
+    ("calc_outcome", Rally, "calc_outcome"),
+    ("commentary", sys.modules[__name__], "print_commentary"),
+    ("score_update", Game, "award_point"),
+]
+
+_unprofiled = {}
+
+def enable_profiling(profiler=None):
+    profiler = PROFILER if profiler is None else profiler
+    disable_profiling()
+    for phase, owner, name in PROFILED_PHASES:
+        function = getattr(owner, name)
+        _unprofiled[(owner, name)] = function
+        setattr(owner, name, timed(profiler.histogram(phase), function))
+    return profiler
+
+def disable_profiling():
+    for (owner, name), function in _unprofiled.items():
+        setattr(owner, name, function)
+    _unprofiled.clear()
@@ -0,0 +1,126 @@
+import threading
+import time
+from collections import namedtuple
+from queue import Empty, SimpleQueue
+
+from .core import STEPS
+
+GameSnapshot = namedtuple('GameSnapshot', ['tick', 'time', 'step', 'score', 'defender', 'attacker', 'comment', 'stats', 'finished'])
+
+class GameLoop:
+    # Runs a core.Game on its own thread at a fixed tick rate. Front ends
+    # send (step, action) commands through a queue and read immutable
+    # snapshots; the (previous, current) pair is swapped in one assignment,
+    # so readers never lock and never see a half-applied rally. Computer
+    # players move on this thread, not on the renderer's.
+    def __init__(self, game, tick_rate=60):
+        self.game = game
+        self.tick_length = 1.0 / tick_rate
+        self.commands = SimpleQueue()
+        self.step_index = 0
+        self.comment = ""
+        self.stats = ""
+        self.tick_count = 0
+        # a computer that serves first has attacked before the first snapshot
+        self.play_computer()
+        snapshot = self.take_snapshot()
+        self.snapshots = (snapshot, snapshot)
+        self.running = False
+        self.thread = None
+
+    @property
+    def snapshot(self):
+        return self.snapshots[1]
+
+    def send(self, step, action):
+        # commands for a step that is no longer current are dropped
+        self.commands.put((step, action))
+
+    def take_snapshot(self):
+        game = self.game
+        return GameSnapshot(
+            self.tick_count,
+            time.perf_counter(),
+            STEPS[self.step_index],
+            dict(game.score),
+            game.current_defender.get_name(),
+            game.current_attacker.get_name(),
+            self.comment,
+            self.stats,
+            game.game_finished(),
+        )
+
+    def owner(self, step):
+        # the player who moves at step, None for confirming a result
+        if step == 'result':
+            return None
+        return self.game.current_attacker if step == 'attack' else self.game.current_defender
+
+    def advance(self, step, action):
+        comment, stats = self.game.update(action, step)
+        if step == 'defense2':
+            self.comment, self.stats = comment, stats
+        self.step_index = (self.step_index+1) % len(STEPS)
+
+    def apply(self, step, action):
+        # a command from the front end, dropped unless it is for the
+        # current step and that step is not a computer player's
+        if step != STEPS[self.step_index]:
+            return False
+        player = self.owner(step)
+        if player is not None and player.computer is not None:
+            return False
+        self.advance(step, action)
+        return True
+
+    def play_computer(self):
+        # computer players make all their steps at once, so no snapshot
+        # shows a screen that is only theirs
+        played = False
+        while True:
+            step = STEPS[self.step_index]
+            action = self.game.computer_action(step)
+            if action is None:
+                return played
+            self.advance(step, action)
+            played = True
+
+    def tick(self):
+        changed = False
+        while True:
+            try:
+                step, action = self.commands.get_nowait()
+            except Empty:
+                break
+            changed |= self.apply(step, action)
+        changed |= self.play_computer()
+        self.tick_count += 1
+        if changed:
+            self.snapshots = (self.snapshots[1], self.take_snapshot())
+
+    def alpha(self, now=None):
+        # how far the renderer is between the last two snapshots, for interpolation
+        now = time.perf_counter() if now is None else now
+        return min(1.0, max(0.0, (now - self.snapshots[1].time) / self.tick_length))
+
+    def run(self):
+        next_tick = time.perf_counter()
+        while self.running and not self.snapshot.finished:
+            self.tick()
+            next_tick += self.tick_length
+            delay = next_tick - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            elif delay < -5 * self.tick_length:
+                # fell far behind, don't try to catch up tick by tick
+                next_tick = time.perf_counter()
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join()
@@ -0,0 +1,99 @@
+import numpy as np
+
+from .ai import cumulative_policy, sample_actions
+from .core import WINNING_SCORE, create_defense_lookup_table, spawn_seeds
+from .equilibrium import N_ATTACK_ACTIONS, N_DEFENSE_ACTIONS, defense_action
+from .probability import MAX_ATTACK_SCORE, NOISE_HIGH, NOISE_LOW
+from .state import MatchState
+
+# The agent plays seat 0 of every match against a policy opponent in seat 1.
+#   observation  int16 [env, (own score, opponent score, agent serves)]
+#   action       attack index when the agent attacks, flat
+#                equilibrium.defense_action index when it serves
+#   reward       +1 for a point won, -1 for a point lost
+AGENT = 0
+OPPONENT = 1
+
+# uniforms every env draws per step
+DEFENSE_NOISE, ATTACK_ROLL, ATTACK_NOISE, OPPONENT_ACTION, COIN = range(5)
+DRAWS = 5
+
+class EnvRandom:
+    # One Generator per env, drawn in blocks of buffer_size steps, so an
+    # env's trajectory only depends on its own seed and actions, not on the
+    # batch size or on the other envs.
+    def __init__(self, seeds, buffer_size=256):
+        self.generators = [np.random.default_rng(seed) for seed in seeds]
+        self.buffer = np.empty((len(seeds), buffer_size, DRAWS))
+        self.position = buffer_size
+
+    def next(self):
+        # [env, draw] for one step
+        if self.position == self.buffer.shape[1]:
+            for env, generator in enumerate(self.generators):
+                generator.random(out=self.buffer[env])
+            self.position = 0
+        self.position += 1
+        return self.buffer[:, self.position-1]
+
+def uniform_policy():
+    return cumulative_policy(np.ones(N_ATTACK_ACTIONS)), cumulative_policy(np.ones(N_DEFENSE_ACTIONS))
+
+class VectorEnv:
+    # n matches stepped together on a MatchState. opponent is an
+    # (attack_cdf, defense_cdf) pair as ai.equilibrium_policy returns it,
+    # uniform by default. Finished matches are reset within the step that
+    # finishes them, the step's info holds their final score.
+    def __init__(self, n, lookup=None, opponent=None, seed=None, target=WINNING_SCORE, buffer_size=256):
+        self.n = n
+        self.lookup = create_defense_lookup_table() if lookup is None else lookup
+        self.attack_cdf, self.defense_cdf = uniform_policy() if opponent is None else opponent
+        self.target = target
+        self.state = MatchState(n)
+        self.random = EnvRandom(spawn_seeds(seed, n), buffer_size)
+        self.envs = np.arange(n)
+
+    def observe(self):
+        obs = np.empty((self.n, 3), dtype=np.int16)
+        obs[:, :2] = self.state.score
+        obs[:, 2] = self.state.defender == AGENT
+        return obs
+
+    def action_sizes(self):
+        # number of valid actions per env in its current role
+        return np.where(self.state.defender == AGENT, N_DEFENSE_ACTIONS, N_ATTACK_ACTIONS)
+
+    def reset(self):
+        self.state.reset()
+        self.state.defender[:] = self.random.next()[:, COIN] < 0.5
+        return self.observe()
+
+    def step(self, actions):
+        actions = np.asarray(actions)
+        if actions.shape != (self.n,) or ((actions < 0) | (actions >= self.action_sizes())).any():
+            raise ValueError("expected one valid action per env for its current role")
+        draws = self.random.next()
+        state = self.state
+        agent_serves = state.defender == AGENT
+        opponent_attack = sample_actions(self.attack_cdf, state.score[:, OPPONENT], state.score[:, AGENT], draws[:, OPPONENT_ACTION])
+        opponent_defense = sample_actions(self.defense_cdf, state.score[:, OPPONENT], state.score[:, AGENT], draws[:, OPPONENT_ACTION])
+        attack = np.where(agent_serves, opponent_attack, actions)
+        block, defense1, defense2 = defense_action(np.where(agent_serves, actions, opponent_defense))
+        state.choose(self.envs, attack, block, defense1, defense2)
+
+        # the noise model of Rally.calc_outcome from this env's uniforms
+        defender, attacker, chance = state.rally_chances(self.lookup, self.envs)
+        defense_score = chance * (NOISE_LOW + (NOISE_HIGH - NOISE_LOW) * draws[:, DEFENSE_NOISE])
+        attack_score = np.floor(draws[:, ATTACK_ROLL] * (MAX_ATTACK_SCORE + 1)) * (NOISE_LOW + (NOISE_HIGH - NOISE_LOW) * draws[:, ATTACK_NOISE])
+        winner = np.where(attack_score <= defense_score, defender, attacker)
+        state.score_rallies(self.envs, winner)
+        reward = np.where(winner == AGENT, 1.0, -1.0).astype(np.float32)
+
+        done = state.finished(self.target)
+        info = {}
+        if done.any():
+            finished = np.flatnonzero(done)
+            info["final_score"] = np.where(done[:, None], state.score, -1)
+            state.reset(finished)
+            state.defender[finished] = draws[finished, COIN] < 0.5
+        return self.observe(), reward, done, info
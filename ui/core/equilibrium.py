@@ -0,0 +1,99 @@
+import hashlib
+from collections import namedtuple
+import numpy as np
+
+from .core import ATTACKS, BLOCKS, DEFENSES, defense_chances
+from .probability import NOISY_ATTACK, defense_win_kernel
+
+# Defender actions are (block, defense1, defense2) triples flattened in
+# C order, attacker actions are the attack indices.
+DEFENSE_ACTION_SHAPE = (len(BLOCKS.BLOCK_LIST), len(DEFENSES.DEFENSE_LIST), len(DEFENSES.DEFENSE_LIST))
+N_ATTACK_ACTIONS = len(ATTACKS.ATTACK_LIST)
+N_DEFENSE_ACTIONS = int(np.prod(DEFENSE_ACTION_SHAPE))
+
+Equilibrium = namedtuple('Equilibrium', ['value', 'attack_strategy', 'defense_strategy'])
+
+_EQUILIBRIUM_CACHE = {}
+
+def ruleset_hash(lookup, model=NOISY_ATTACK):
+    digest = hashlib.sha1()
+    digest.update(str((lookup.shape, lookup.dtype.str, model)).encode())
+    digest.update(np.ascontiguousarray(lookup).tobytes())
+    return digest.hexdigest()
+
+def defense_action(index):
+    # flat defender action index -> (block, defense1, defense2)
+    return np.unravel_index(index, DEFENSE_ACTION_SHAPE)
+
+def payoff_matrix(lookup, model=NOISY_ATTACK):
+    # payoff[attack, defense_action] = P(defense wins the rally)
+    attack = np.arange(N_ATTACK_ACTIONS).reshape(-1, 1)
+    block, defense1, defense2 = defense_action(np.arange(N_DEFENSE_ACTIONS))
+    chance = defense_chances(lookup, attack, block, defense1, defense2)
+    return defense_win_kernel(model)[chance]
+
+def _solve_positive_game(game):
+    # Simplex on max sum(w) s.t. game @ w <= 1, w >= 0 for a game with
+    # positive entries, rows maximizing. The optimal duals are the row
+    # strategy and 1/sum(w) the value. Bland's rule keeps the degenerate
+    # pivots (many identical rows) from cycling.
+    rows, cols = game.shape
+    tableau = np.zeros((rows+1, cols+rows+1))
+    tableau[:rows, :cols] = game
+    tableau[:rows, cols:cols+rows] = np.eye(rows)
+    tableau[:rows, -1] = 1.0
+    tableau[rows, :cols] = -1.0
+    basis = np.arange(cols, cols+rows)
+    eps = 1e-12
+    while True:
+        entering = np.flatnonzero(tableau[rows, :-1] < -eps)
+        if not len(entering):
+            break
+        col = entering[0]
+        column = tableau[:rows, col]
+        positive = column > eps
+        ratios = np.full(rows, np.inf)
+        ratios[positive] = tableau[:rows, -1][positive] / column[positive]
+        candidates = np.flatnonzero(ratios <= ratios.min() + eps)
+        row = candidates[np.argmin(basis[candidates])]
+        tableau[row] /= tableau[row, col]
+        pivot_column = tableau[:, col].copy()
+        pivot_column[row] = 0.0
+        tableau -= np.outer(pivot_column, tableau[row])
+        basis[row] = col
+    value = 1.0 / tableau[rows, -1]
+    col_strategy = np.zeros(cols)
+    in_basis = basis < cols
+    col_strategy[basis[in_basis]] = tableau[:rows, -1][in_basis]
+    row_strategy = tableau[rows, cols:cols+rows]
+    return value, row_strategy * value, col_strategy * value
+
+def solve_equilibrium(payoff):
+    # the defender (columns of payoff) maximizes, the attacker minimizes
+    value, defense_strategy, attack_strategy = _solve_positive_game(payoff.T)
+    defense_strategy = np.clip(defense_strategy, 0, None)
+    attack_strategy = np.clip(attack_strategy, 0, None)
+    return Equilibrium(value, attack_strategy / attack_strategy.sum(), defense_strategy / defense_strategy.sum())
+
+def equilibrium(lookup, model=NOISY_ATTACK):
+    key = ruleset_hash(lookup, model)
+    if key not in _EQUILIBRIUM_CACHE:
+        result = solve_equilibrium(payoff_matrix(lookup, model))
+        for strategy in (result.attack_strategy, result.defense_strategy):
+            strategy.setflags(write=False)
+        _EQUILIBRIUM_CACHE[key] = result
+    return _EQUILIBRIUM_CACHE[key]
+
+def expected_defense_win(payoff, attack_strategy, defense_strategy):
+    return float(attack_strategy @ payoff @ defense_strategy)
+
+def exploitability(lookup, attack_strategy=None, defense_strategy=None, model=NOISY_ATTACK):
+    # how much a best-responding opponent gains over the game value, the value comes from the cached equilibrium
+    payoff = payoff_matrix(lookup, model)
+    value = equilibrium(lookup, model).value
+    gain = 0.0
+    if attack_strategy is not None:
+        gain += (attack_strategy @ payoff).max() - value
+    if defense_strategy is not None:
+        gain += value - (payoff @ defense_strategy).min()
+    return gain
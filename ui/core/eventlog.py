@@ -0,0 +1,120 @@
+import os
+from abc import ABC, abstractmethod
+import numpy as np
+
+# Append-only rally log: a 16 byte header, then one fixed-width 32 byte
+# record per rally. Player ids are seats in Game.players, points are the
+# seats' match scores after the rally.
+MAGIC = b"BCRALLYS"
+LOG_VERSION = 1
+
+RALLY_RECORD = np.dtype([
+    ('match', '<u8'),
+    ('rally', '<u4'),
+    ('attacker', 'u1'),
+    ('defender', 'u1'),
+    ('attack', 'u1'),
+    ('block', 'u1'),
+    ('defense1', 'u1'),
+    ('defense2', 'u1'),
+    ('chance', 'u1'),
+    ('winner', 'u1'),
+    ('defense_score', '<f4'),
+    ('attack_score', '<f4'),
+    ('points0', '<u2'),
+    ('points1', '<u2'),
+])
+
+HEADER = np.dtype([('magic', 'S8'), ('version', '<u4'), ('record_size', '<u4')])
+
+class RallyBuffer(ABC):
+    # Collects records in a numpy block and hands each full block to
+    # write(); Game.play_rally calls log_rally on any of these.
+    def __init__(self, buffer_size=4096):
+        self.buffer = np.zeros(buffer_size, dtype=RALLY_RECORD)
+        self.position = 0
+
+    def append(self, match, rally, attacker, defender, attack, block, defense1, defense2, chance, winner, defense_score, attack_score, points0, points1):
+        self.buffer[self.position] = (match, rally, attacker, defender, attack, block, defense1, defense2, chance, winner, defense_score, attack_score, points0, points1)
+        self.position += 1
+        if self.position == len(self.buffer):
+            self.flush()
+
+    def log_rally(self, game, rally, winner):
+        # called by Game.play_rally once the score is updated
+        players = game.players
+        attacker, defender = rally.attacker, rally.defender
+        self.append(
+            game.match_id, len(game.moves) - 1, players.index(attacker), players.index(defender),
+            attacker.attack.index, defender.block.index, defender.defense1.index, defender.defense2.index,
+            rally.defense_chance, players.index(winner), rally.defense_score, rally.attack_score,
+            game.score[players[0].name], game.score[players[1].name],
+        )
+
+    @abstractmethod
+    def write(self, records):
+        pass
+
+    def flush(self):
+        if self.position:
+            self.write(self.buffer[:self.position])
+            self.position = 0
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class RallyLogWriter(RallyBuffer):
+    # appends every full block to the file in one write
+    def __init__(self, path, buffer_size=4096):
+        super().__init__(buffer_size)
+        self.file = open(path, "ab")
+        size = self.file.tell()
+        if size < HEADER.itemsize:
+            # empty, or the header itself was cut short by a crashed writer
+            self.file.truncate(0)
+            self.file.write(np.array([(MAGIC, LOG_VERSION, RALLY_RECORD.itemsize)], dtype=HEADER).tobytes())
+        else:
+            check_header(path)
+            # drop a record cut short by a crashed writer, or every record appended after it would be misaligned
+            self.file.truncate(HEADER.itemsize + (size - HEADER.itemsize) // RALLY_RECORD.itemsize * RALLY_RECORD.itemsize)
+
+    def write(self, records):
+        self.file.write(records.tobytes())
+
+    def flush(self):
+        super().flush()
+        self.file.flush()
+
+    def close(self):
+        if not self.file.closed:
+            self.flush()
+            self.file.close()
+
+def check_header(path):
+    header = np.fromfile(path, dtype=HEADER, count=1)
+    if len(header) != 1 or header['magic'][0] != MAGIC:
+        raise ValueError(f"{path} is not a rally log")
+    if header['version'][0] != LOG_VERSION:
+        raise ValueError(f"{path} has log version {header['version'][0]}, expected {LOG_VERSION}")
+    if header['record_size'][0] != RALLY_RECORD.itemsize:
+        raise ValueError(f"{path} has {header['record_size'][0]} byte records, expected {RALLY_RECORD.itemsize}")
+
+def read_rally_log(path):
+    # Memory maps the records, fields are columns: log['winner'], log[10**9:].
+    # A record cut short by a crashed writer is left out.
+    check_header(path)
+    count = (os.path.getsize(path) - HEADER.itemsize) // RALLY_RECORD.itemsize
+    if count == 0:
+        return np.zeros(0, dtype=RALLY_RECORD)
+    return np.memmap(path, dtype=RALLY_RECORD, mode='r', offset=HEADER.itemsize, shape=(count,))
+
+def iter_chunks(log, chunk_size=1 << 20):
+    # fixed-size slices, so a pass over the log never holds more than a chunk in memory
+    for start in range(0, len(log), chunk_size):
+        yield log[start:start+chunk_size]
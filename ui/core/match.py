@@ -0,0 +1,97 @@
+from functools import lru_cache
+import numpy as np
+
+from .core import WINNING_SCORE
+
+# Score states are (score_a, score_b, server) with server 0 for side a and
+# 1 for side b. The server is the defender of the next rally and whoever
+# wins a rally serves the next one. p_a / p_b are the probabilities that
+# a / b win a rally they serve.
+
+def deuce_win_probability(p_a, p_b):
+    # P(a wins | tied in the win-by-2 region) for a serving and b serving.
+    # Being one point up always means having served: the leader wins with
+    # its own serve probability or falls back to a tie served by the other.
+    q_a = 1 - p_a
+    q_b = 1 - p_b
+    matrix = np.array([[1 - q_a*q_b, -p_a*q_a], [-p_b*q_b, 1 - q_a*q_b]])
+    rhs = np.array([p_a*p_a, q_b*p_a])
+    det = matrix[0, 0]*matrix[1, 1] - matrix[0, 1]*matrix[1, 0]
+    if det == 0:
+        # neither side can ever win a point on serve, the score just alternates
+        return 0.5, 0.5
+    tie_a = (rhs[0]*matrix[1, 1] - matrix[0, 1]*rhs[1]) / det
+    tie_b = (matrix[0, 0]*rhs[1] - rhs[0]*matrix[1, 0]) / det
+    return tie_a, tie_b
+
+@lru_cache(maxsize=128)
+def match_win_table(p_a, p_b, target=WINNING_SCORE):
+    # table[score_a, score_b, server] = P(a wins the match) for every
+    # non-terminal state with both scores <= target, terminal states hold 0/1
+    tie_a, tie_b = deuce_win_probability(p_a, p_b)
+    table = np.zeros((target+1, target+1, 2))
+    for score_a in range(target, -1, -1):
+        for score_b in range(target, -1, -1):
+            if max(score_a, score_b) >= target and abs(score_a - score_b) >= 2:
+                table[score_a, score_b] = 1.0 if score_a > score_b else 0.0
+            elif min(score_a, score_b) >= target-1:
+                lead = score_a - score_b
+                if lead == 0:
+                    table[score_a, score_b] = (tie_a, tie_b)
+                elif lead == 1:
+                    table[score_a, score_b] = (p_a + (1-p_a)*tie_b, (1-p_b) + p_b*tie_b)
+                else:
+                    table[score_a, score_b] = (p_a*tie_a, (1-p_b)*tie_a)
+            else:
+                win_a = table[score_a+1, score_b, 0]
+                win_b = table[score_a, score_b+1, 1]
+                table[score_a, score_b] = (p_a*win_a + (1-p_a)*win_b, (1-p_b)*win_a + p_b*win_b)
+    table.setflags(write=False)
+    return table
+
+def match_win_probability(score_a, score_b, server, p_a, p_b, target=WINNING_SCORE):
+    # scores past the table are shifted back into the deuce region
+    shift = max(0, min(score_a, score_b) - (target-1))
+    score_a -= shift
+    score_b -= shift
+    if max(score_a, score_b) > target:
+        return 1.0 if score_a > score_b else 0.0
+    return float(match_win_table(float(p_a), float(p_b), target)[score_a, score_b, server])
+
+@lru_cache(maxsize=128)
+def expected_length_table(p_a, p_b, target=WINNING_SCORE):
+    # table[score_a, score_b, server] = expected number of rallies left,
+    # laid out like match_win_table; inf when the deuce never ends
+    q_a = 1 - p_a
+    q_b = 1 - p_b
+    # from a tie every two rallies either end the match or tie it again
+    det = (1 - q_a*q_b)**2 - p_a*q_a*p_b*q_b
+    if det == 0:
+        tie_a = tie_b = np.inf
+    else:
+        tie_a = 2*((1 - q_a*q_b) + p_a*q_a) / det
+        tie_b = 2*((1 - q_a*q_b) + p_b*q_b) / det
+    table = np.zeros((target+1, target+1, 2))
+    for score_a in range(target, -1, -1):
+        for score_b in range(target, -1, -1):
+            if max(score_a, score_b) >= target and abs(score_a - score_b) >= 2:
+                table[score_a, score_b] = 0.0
+            elif min(score_a, score_b) >= target-1:
+                lead = score_a - score_b
+                if lead == 0:
+                    table[score_a, score_b] = (tie_a, tie_b)
+                elif lead == 1:
+                    table[score_a, score_b] = (1 + q_a*tie_b, 1 + p_b*tie_b)
+                else:
+                    table[score_a, score_b] = (1 + p_a*tie_a, 1 + q_b*tie_a)
+            else:
+                next_a = table[score_a+1, score_b, 0]
+                next_b = table[score_a, score_b+1, 1]
+                table[score_a, score_b] = (1 + p_a*next_a + q_a*next_b, 1 + q_b*next_a + p_b*next_b)
+    table.setflags(write=False)
+    return table
+
+def expected_match_length(p_a, p_b, target=WINNING_SCORE):
+    # expected rallies of a whole match, the first server decided by a coin toss
+    table = expected_length_table(float(p_a), float(p_b), target)
+    return float(table[0, 0].mean())
@@ -0,0 +1,55 @@
+from functools import lru_cache
+import numpy as np
+
+# Noise models of the rally resolution in the different front ends:
+#   NOISY_ATTACK (ui/core/core.py):
+#       chance * U(0.95, 1.05) vs randint(0, 101) * U(0.95, 1.05)
+#   NOISY_DEFENSE (cli/oocli.py):
+#       chance * U(0.95, 1.05) vs randint(0, 101)
+#   NO_NOISE (cli/simplecli.py):
+#       chance vs randint(0, 101)
+# The defense wins ties in all of them.
+NOISY_ATTACK = "noisy-attack"
+NOISY_DEFENSE = "noisy-defense"
+NO_NOISE = "no-noise"
+
+NOISE_LOW = 0.95
+NOISE_HIGH = 1.05
+MAX_ATTACK_SCORE = 100
+
+def _ratio_cdf(ratio):
+    # P(U2 <= ratio * U1) for independent U1, U2 ~ U(NOISE_LOW, NOISE_HIGH)
+    width = NOISE_HIGH - NOISE_LOW
+    ratio = np.maximum(ratio, 1e-12)
+    lower = np.clip(NOISE_LOW / ratio, NOISE_LOW, NOISE_HIGH)
+    upper = np.clip(NOISE_HIGH / ratio, NOISE_LOW, NOISE_HIGH)
+    # ratio*u1 - NOISE_LOW rises linearly on [lower, upper], is capped at width above
+    ramp = ratio/2 * (upper**2 - lower**2) - NOISE_LOW * (upper - lower)
+    return (ramp + width * (NOISE_HIGH - upper)) / width**2
+
+def defense_win_probability(chance, model=NOISY_ATTACK):
+    # exact P(defense wins | defense_chance) for arrays of chances
+    chance = np.asarray(chance, dtype=np.float64)[..., None]
+    attack_score = np.arange(MAX_ATTACK_SCORE+1, dtype=np.float64)
+    if model == NOISY_ATTACK:
+        wins = _ratio_cdf(chance / np.maximum(attack_score, 1))
+        wins[..., 0] = 1.0
+    elif model == NOISY_DEFENSE:
+        wins = np.clip((NOISE_HIGH - attack_score / np.maximum(chance, 1e-12)) / (NOISE_HIGH - NOISE_LOW), 0, 1)
+        wins[..., 0] = 1.0
+    elif model == NO_NOISE:
+        wins = (attack_score <= chance).astype(np.float64)
+    else:
+        raise ValueError(f"unknown noise model: {model}")
+    return wins.mean(axis=-1)
+
+@lru_cache(maxsize=None)
+def defense_win_kernel(model=NOISY_ATTACK):
+    # kernel[chance] for every chance value an outcome table can hold
+    kernel = defense_win_probability(np.arange(MAX_ATTACK_SCORE+1), model)
+    kernel.setflags(write=False)
+    return kernel
+
+def defense_win_table(lookup, model=NOISY_ATTACK):
+    # outcome table of chances -> table of exact defense win probabilities
+    return defense_win_kernel(model)[lookup]
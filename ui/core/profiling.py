@@ -0,0 +1,119 @@
+import functools
+import json
+import time
+from bisect import bisect_left
+
+# Fixed-bucket latency histograms and counters. Observing is a bisect and
+# two additions, nothing is allocated, so it can stay on in production.
+# Updates are not locked: two threads feeding the same histogram may lose
+# a count now and then, which is fine for timing statistics.
+
+# bucket upper bounds in nanoseconds, 1-2.5-5 steps from 100ns to 10s,
+# the last bucket counts everything slower
+BUCKETS_NS = tuple(int(mantissa * 10**exponent) for exponent in range(2, 10) for mantissa in (1, 2.5, 5)) + (10**10,)
+
+class Histogram:
+    def __init__(self, bounds=BUCKETS_NS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0
+
+    def observe(self, ns):
+        self.counts[bisect_left(self.bounds, ns)] += 1
+        self.total += ns
+
+    @property
+    def count(self):
+        return sum(self.counts)
+
+    def quantile(self, q):
+        # upper bound of the bucket holding the q-quantile, None if empty or above the last bound
+        count = self.count
+        if count == 0:
+            return None
+        seen = 0
+        for bound, bucket in zip(self.bounds, self.counts):
+            seen += bucket
+            if seen >= q * count:
+                return bound
+        return None
+
+    def merge(self, other):
+        self.counts = [own + theirs for own, theirs in zip(self.counts, other.counts)]
+        self.total += other.total
+        return self
+
+    def to_dict(self):
+        count = self.count
+        return {
+            "count": count,
+            "sum_ns": self.total,
+            "mean_ns": self.total / count if count else None,
+            "p50_ns": self.quantile(0.5),
+            "p99_ns": self.quantile(0.99),
+            "bounds_ns": list(self.bounds),
+            "counts": list(self.counts),
+        }
+
+class Profiler:
+    def __init__(self):
+        self.histograms = {}
+        self.counters = {}
+
+    def histogram(self, name):
+        if name not in self.histograms:
+            self.histograms[name] = Histogram()
+        return self.histograms[name]
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def reset(self):
+        self.histograms.clear()
+        self.counters.clear()
+
+    def to_json(self):
+        return {
+            "histograms": {name: histogram.to_dict() for name, histogram in sorted(self.histograms.items())},
+            "counters": dict(sorted(self.counters.items())),
+        }
+
+    def to_prometheus(self, prefix="beach_chess"):
+        # text exposition format, one histogram family labelled by phase
+        lines = []
+        if self.histograms:
+            metric = f"{prefix}_phase_seconds"
+            lines += [f"# HELP {metric} time spent per call in each profiled phase", f"# TYPE {metric} histogram"]
+            for name, histogram in sorted(self.histograms.items()):
+                cumulative = 0
+                for bound, bucket in zip(histogram.bounds, histogram.counts):
+                    cumulative += bucket
+                    lines.append(f'{metric}_bucket{{phase="{name}",le="{bound / 1e9:g}"}} {cumulative}')
+                lines.append(f'{metric}_bucket{{phase="{name}",le="+Inf"}} {histogram.count}')
+                lines.append(f'{metric}_sum{{phase="{name}"}} {histogram.total / 1e9:.9f}')
+                lines.append(f'{metric}_count{{phase="{name}"}} {histogram.count}')
+        for name, value in sorted(self.counters.items()):
+            metric = f"{prefix}_{name}_total"
+            lines += [f"# TYPE {metric} counter", f"{metric} {value}"]
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        # Prometheus text for a .prom path, JSON otherwise
+        with open(path, "w") as f:
+            if path.endswith(".prom"):
+                f.write(self.to_prometheus())
+            else:
+                json.dump(self.to_json(), f, indent=2)
+
+# the process-wide profiler the engine hooks report to by default
+PROFILER = Profiler()
+
+def timed(histogram, function):
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter_ns()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            histogram.observe(time.perf_counter_ns() - start)
+    return wrapper
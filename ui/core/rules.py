@@ -0,0 +1,124 @@
+import hashlib
+import json
+import os
+from collections import namedtuple
+import numpy as np
+
+# Rulesets are JSON files in rulesets/ (or anywhere else, by path):
+#   version               format version, files newer than RULES_VERSION are refused
+#   name                  label only, not part of the hash
+#   attacks, blocks,      action names, an action's index is its position;
+#   defenses              a defense with an attack's name matches that attack
+#   mistake_chance        defense chance when no rule applies
+#   block_chance          chance per block rule kind
+#   defense_match_chance  chance of a matching defense in slot 0 and slot 1
+#   block_rules           {"attack", "block", "kind"} entries
+RULES_VERSION = 1
+RULES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "rulesets")
+
+RuleSpec = namedtuple('RuleSpec', ['version', 'name', 'attacks', 'blocks', 'defenses', 'mistake_chance', 'block_chance', 'defense_match_chance', 'block_rules'])
+
+FIELDS = set(RuleSpec._fields)
+
+class RulesetError(ValueError):
+    pass
+
+def _chance(value, what):
+    if isinstance(value, bool) or not isinstance(value, int) or not 0 <= value <= 100:
+        raise RulesetError(f"{what} must be an integer percentage, got {value!r}")
+    return value
+
+def _actions(values, what):
+    if not isinstance(values, list) or not values or not all(isinstance(value, str) and value for value in values):
+        raise RulesetError(f"{what} must be a non-empty list of names")
+    if len(set(values)) != len(values):
+        raise RulesetError(f"{what} has duplicate names")
+    return tuple(values)
+
+def parse_rules(data):
+    # validated RuleSpec from the file format, e.g. a json.load result or rules_dict()
+    if not isinstance(data, dict):
+        raise RulesetError("rules must be an object")
+    unknown = set(data) - FIELDS
+    missing = FIELDS - set(data) - {'name'}
+    if unknown or missing:
+        raise RulesetError(f"unknown fields {sorted(unknown)}, missing fields {sorted(missing)}")
+    version = data["version"]
+    if not isinstance(version, int) or not 1 <= version <= RULES_VERSION:
+        raise RulesetError(f"rules version {version!r} is not supported, {RULES_VERSION} is the newest")
+    attacks = _actions(data["attacks"], "attacks")
+    blocks = _actions(data["blocks"], "blocks")
+    defenses = _actions(data["defenses"], "defenses")
+    if not isinstance(data["block_chance"], dict):
+        raise RulesetError("block_chance must map rule kinds to chances")
+    block_chance = {kind: _chance(chance, f"block_chance[{kind!r}]") for kind, chance in sorted(data["block_chance"].items())}
+    match_chance = data["defense_match_chance"]
+    if not isinstance(match_chance, list) or len(match_chance) != 2:
+        raise RulesetError("defense_match_chance needs one chance per defense slot")
+    if not isinstance(data["block_rules"], list):
+        raise RulesetError("block_rules must be a list")
+    block_rules = []
+    seen = set()
+    for rule in data["block_rules"]:
+        if not isinstance(rule, dict) or set(rule) != {"attack", "block", "kind"}:
+            raise RulesetError(f"block rule {rule!r} needs exactly attack, block and kind")
+        if rule["attack"] not in attacks or rule["block"] not in blocks or rule["kind"] not in block_chance:
+            raise RulesetError(f"block rule {rule!r} names an unknown attack, block or kind")
+        if (rule["attack"], rule["block"]) in seen:
+            raise RulesetError(f"more than one block rule for {rule['attack']} against {rule['block']}")
+        seen.add((rule["attack"], rule["block"]))
+        block_rules.append((rule["attack"], rule["block"], rule["kind"]))
+    return RuleSpec(
+        version, data.get("name", "custom"), attacks, blocks, defenses,
+        _chance(data["mistake_chance"], "mistake_chance"), block_chance,
+        tuple(_chance(chance, "defense_match_chance") for chance in match_chance), tuple(block_rules),
+    )
+
+def load_rules(name):
+    # a file path, or the name of one of the bundled rulesets
+    path = name if os.path.sep in name or name.endswith(".json") else os.path.join(RULES_DIR, f"{name}.json")
+    with open(path) as f:
+        try:
+            return parse_rules(json.load(f))
+        except ValueError as e:
+            raise RulesetError(f"{path}: {e}") from None
+
+def rules_dict(rules):
+    # the rules as plain data in file order, without the name
+    return {
+        "version": rules.version,
+        "attacks": list(rules.attacks),
+        "blocks": list(rules.blocks),
+        "defenses": list(rules.defenses),
+        "mistake_chance": rules.mistake_chance,
+        "block_chance": dict(rules.block_chance),
+        "defense_match_chance": list(rules.defense_match_chance),
+        "block_rules": [{"attack": attack, "block": block, "kind": kind} for attack, block, kind in rules.block_rules],
+    }
+
+def rules_hash(rules):
+    # same rules, same hash, whatever the key order or name in the file
+    return hashlib.sha1(json.dumps(rules_dict(rules), sort_keys=True, separators=(',', ':')).encode()).hexdigest()
+
+def require_actions(rules, attacks, blocks, defenses):
+    # front ends with hardcoded actions check that the rules agree with them
+    if (rules.attacks, rules.blocks, rules.defenses) != (tuple(attacks), tuple(blocks), tuple(defenses)):
+        raise RulesetError(f"ruleset {rules.name} does not define the actions this front end offers")
+
+def compile_rules(rules):
+    # Dense read-only table indexed [attack, block, defender_slot, defense],
+    # one extra unnamed row per action axis so the unset index -1 resolves
+    # like any other action.
+    shape = (len(rules.attacks)+1, len(rules.blocks)+1, 2, len(rules.defenses)+1)
+    lookup = np.full(shape, rules.mistake_chance, dtype=np.uint8)
+    if rules.block_rules:
+        attack_index = {name: index for index, name in enumerate(rules.attacks)}
+        block_index = {name: index for index, name in enumerate(rules.blocks)}
+        attacks, blocks, kinds = zip(*rules.block_rules)
+        chances = np.array([rules.block_chance[kind] for kind in kinds], dtype=np.uint8)
+        lookup[[attack_index[name] for name in attacks], [block_index[name] for name in blocks]] = chances[:, None, None]
+    matches = np.equal.outer(np.array(rules.attacks + ("",)), np.array(rules.defenses + ("",)))
+    match_chance = np.array(rules.defense_match_chance, dtype=np.uint8).reshape(1, 1, -1, 1)
+    lookup = np.where(matches[:, None, None, :], match_chance, lookup)
+    lookup.setflags(write=False)
+    return lookup
@@ -0,0 +1,351 @@
+import argparse
+import asyncio
+import json
+import random
+import struct
+import time
+import numpy as np
+
+from .core import ATTACKS, BLOCKS, DEFENSES, Game, Player, create_defense_lookup_table, defense_chances, enable_profiling
+
+# Every message is a frame of (type, payload length) bytes plus the payload.
+#   client -> server
+#     JOIN      name (utf-8, at most MAX_NAME_BYTES)
+#     ATTACK    attack
+#     DEFENSE   block, defense1, defense2
+#   server -> client
+#     WAITING   -
+#     START     own seat, serving seat, opponent name (utf-8)
+#     TURN      role (ROLE_ATTACK / ROLE_DEFENSE)
+#     RESULT    attack, block, defense1, defense2, chance, winner seat, score seat 0, score seat 1
+#     FINISHED  winner seat, score seat 0, score seat 1
+#     ERROR     one of the ERROR_* codes
+# The rally comment is left to the client, everything it needs is in RESULT.
+JOIN = 1
+ATTACK = 2
+DEFENSE = 3
+WAITING = 10
+START = 11
+TURN = 12
+RESULT = 13
+FINISHED = 14
+ERROR = 15
+
+ROLE_ATTACK = 0
+ROLE_DEFENSE = 1
+
+ERROR_TIMEOUT = 1
+ERROR_PROTOCOL = 2
+ERROR_OPPONENT_LEFT = 3
+ERROR_NAME = 4
+
+HEADER = struct.Struct('!BB')
+RESULT_PAYLOAD = struct.Struct('!BBBBBBHH')
+FINISHED_PAYLOAD = struct.Struct('!BHH')
+
+# a name has to fit a START payload (two seat bytes, the name) after the
+# "#2" a name clash adds, and the payload length is one byte
+NAME_CLASH_SUFFIX = "#2"
+MAX_NAME_BYTES = 255 - 2 - len(NAME_CLASH_SUFFIX.encode())
+
+class ProtocolError(Exception):
+    pass
+
+def frame(kind, payload=b''):
+    return HEADER.pack(kind, len(payload)) + payload
+
+async def read_frame(reader):
+    kind, length = HEADER.unpack(await reader.readexactly(HEADER.size))
+    payload = await reader.readexactly(length) if length else b''
+    return kind, payload
+
+# unsent bytes per client before a send waits for the client to catch up
+SEND_BUFFER_LIMIT = 16 * 1024
+
+class Connection:
+    def __init__(self, reader, writer, send_timeout):
+        self.reader = reader
+        self.writer = writer
+        self.send_timeout = send_timeout
+        self.name = ""
+        self.done = asyncio.Event()
+        self.watch = None
+
+    async def send(self, kind, payload=b''):
+        # Backpressure: once a client stops reading, the sender waits for the
+        # buffer to drain, and a client that stays stuck past send_timeout
+        # loses its session. The common case writes without suspending.
+        self.writer.write(frame(kind, payload))
+        if self.writer.transport.get_write_buffer_size() > SEND_BUFFER_LIMIT:
+            await asyncio.wait_for(self.writer.drain(), self.send_timeout)
+
+    async def watch_for_leaving(self):
+        # a waiting client sends nothing, so any read returning means it
+        # closed the connection or broke the protocol
+        try:
+            await self.reader.read(1)
+        except ConnectionError:
+            pass
+
+    async def stop_watching(self):
+        # True if the client is still there to be paired
+        self.watch.cancel()
+        await asyncio.wait([self.watch])
+        return self.watch.cancelled() and not self.reader.at_eof() and not self.done.is_set()
+
+    async def expect(self, kind):
+        received, payload = await read_frame(self.reader)
+        if received != kind:
+            raise ProtocolError(f"expected message {kind}, got {received}")
+        return payload
+
+class Watchdog:
+    # Per-session move timeout. A timer cancels the session task when it
+    # runs out; this is much cheaper than a wait_for around every read.
+    def __init__(self, timeout):
+        self.timeout = timeout
+        self.handle = None
+        self.expired = False
+
+    def arm(self):
+        task = asyncio.current_task()
+        self.handle = asyncio.get_running_loop().call_later(self.timeout, self.expire, task)
+
+    def expire(self, task):
+        self.expired = True
+        task.cancel()
+
+    def disarm(self):
+        if self.handle is not None:
+            self.handle.cancel()
+            self.handle = None
+
+class GameServer:
+    # Pairs clients in the order they join and plays each pair as one
+    # core.Game session on the event loop.
+    def __init__(self, lookup=None, move_timeout=60.0, send_timeout=10.0, seed=None):
+        self.lookup = create_defense_lookup_table() if lookup is None else lookup
+        self.move_timeout = move_timeout
+        self.send_timeout = send_timeout
+        self.seeds = np.random.SeedSequence(seed)
+        self.waiting = None
+        self.sessions = 0
+        self.finished_sessions = 0
+        self.rallies = 0
+
+    async def handle_client(self, reader, writer):
+        connection = Connection(reader, writer, self.send_timeout)
+        try:
+            name = (await asyncio.wait_for(connection.expect(JOIN), self.move_timeout)).decode(errors='replace') or "player"
+            # measured after decoding, a replaced invalid byte takes three
+            if len(name.encode()) > MAX_NAME_BYTES:
+                await connection.send(ERROR, bytes([ERROR_NAME]))
+                return
+            connection.name = name
+            opponent = await self.take_waiting()
+            if opponent is None:
+                await self.wait_for_opponent(connection)
+            else:
+                await self.play_session([opponent, connection])
+        except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError, ProtocolError):
+            pass
+        finally:
+            connection.done.set()
+            if self.waiting is connection:
+                self.waiting = None
+            if connection.watch is not None:
+                connection.watch.cancel()
+            writer.close()
+
+    async def take_waiting(self):
+        # the waiting client, None if there is none or every one that
+        # waited has left, the joiner then waits itself
+        while self.waiting is not None:
+            opponent, self.waiting = self.waiting, None
+            if await opponent.stop_watching():
+                return opponent
+        return None
+
+    async def wait_for_opponent(self, connection):
+        # the joiner pairing this connection cancels the watch, a watch
+        # that returns by itself means the client left while waiting
+        connection.watch = asyncio.ensure_future(connection.watch_for_leaving())
+        self.waiting = connection
+        await connection.send(WAITING)
+        await asyncio.wait([connection.watch])
+        if connection.watch.cancelled():
+            await connection.done.wait()
+
+    async def play_session(self, connections):
+        self.sessions += 1
+        watchdog = Watchdog(self.move_timeout)
+        try:
+            await self.play_rallies(connections, watchdog)
+            self.finished_sessions += 1
+        except asyncio.CancelledError:
+            if not watchdog.expired:
+                raise
+            task = asyncio.current_task()
+            if hasattr(task, 'uncancel'):
+                task.uncancel()
+            await self.broadcast(connections, ERROR, bytes([ERROR_TIMEOUT]))
+        except asyncio.TimeoutError:
+            await self.broadcast(connections, ERROR, bytes([ERROR_TIMEOUT]))
+        except ProtocolError:
+            await self.broadcast(connections, ERROR, bytes([ERROR_PROTOCOL]))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            await self.broadcast(connections, ERROR, bytes([ERROR_OPPONENT_LEFT]))
+        finally:
+            watchdog.disarm()
+            self.sessions -= 1
+            for connection in connections:
+                connection.done.set()
+
+    async def broadcast(self, connections, kind, payload=b''):
+        for connection in connections:
+            try:
+                await connection.send(kind, payload)
+            except (asyncio.TimeoutError, ConnectionError):
+                pass
+
+    async def play_rallies(self, connections, watchdog):
+        names = [connections[0].name, connections[1].name]
+        if names[0] == names[1]:
+            names[1] += NAME_CLASH_SUFFIX
+        players = [Player(names[0]), Player(names[1])]
+        game = Game(players[0], players[1], self.lookup, self.seeds.spawn(1)[0], verbose=False)
+        game.coin_toss()
+        seats = {id(player): seat for seat, player in enumerate(players)}
+        for seat, connection in enumerate(connections):
+            await connection.send(START, bytes([seat, seats[id(game.current_defender)]]) + names[1-seat].encode())
+        while not game.game_finished():
+            attacker = connections[seats[id(game.current_attacker)]]
+            defender = connections[seats[id(game.current_defender)]]
+            await attacker.send(TURN, bytes([ROLE_ATTACK]))
+            await defender.send(TURN, bytes([ROLE_DEFENSE]))
+            # both clients move at the same time, their frames wait in the buffers
+            watchdog.arm()
+            attack = await attacker.expect(ATTACK)
+            defense = await defender.expect(DEFENSE)
+            watchdog.disarm()
+            if len(attack) != 1 or len(defense) != 3 or attack[0] >= len(ATTACKS.ATTACK_LIST) \
+                    or defense[0] >= len(BLOCKS.BLOCK_LIST) or max(defense[1:]) >= len(DEFENSES.DEFENSE_LIST):
+                raise ProtocolError("action out of range")
+            chance = int(defense_chances(self.lookup, attack[0], defense[0], defense[1], defense[2]))
+            game.update(ATTACKS.ATTACK_DICT[attack[0]], 'attack')
+            game.update(BLOCKS.BLOCK_DICT[defense[0]], 'block')
+            game.update(DEFENSES.DEFENSE_DICT[defense[1]], 'defense1')
+            game.update(DEFENSES.DEFENSE_DICT[defense[2]], 'defense2')
+            self.rallies += 1
+            winner = seats[id(game.current_defender)]
+            result = RESULT_PAYLOAD.pack(attack[0], defense[0], defense[1], defense[2], chance, winner, game.score[names[0]], game.score[names[1]])
+            for connection in connections:
+                await connection.send(RESULT, result)
+        finished = FINISHED_PAYLOAD.pack(seats[id(game.current_defender)], game.score[names[0]], game.score[names[1]])
+        for connection in connections:
+            await connection.send(FINISHED, finished)
+
+    async def serve(self, host="127.0.0.1", port=8765):
+        return await asyncio.start_server(self.handle_client, host, port, backlog=4096)
+
+async def random_client(host, port, name, rng, latencies):
+    # stand-in for a remote player, answers every turn with a random move
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write(frame(JOIN, name.encode()))
+        sent = None
+        while True:
+            kind, payload = await read_frame(reader)
+            if kind == TURN:
+                if payload[0] == ROLE_ATTACK:
+                    move = frame(ATTACK, bytes([rng.randrange(len(ATTACKS.ATTACK_LIST))]))
+                else:
+                    move = frame(DEFENSE, bytes([rng.randrange(len(BLOCKS.BLOCK_LIST)), rng.randrange(len(DEFENSES.DEFENSE_LIST)), rng.randrange(len(DEFENSES.DEFENSE_LIST))]))
+                sent = time.perf_counter()
+                writer.write(move)
+            elif kind == RESULT and sent is not None:
+                latencies.append(time.perf_counter() - sent)
+            elif kind in (FINISHED, ERROR):
+                return kind
+    finally:
+        writer.close()
+
+def raise_file_limit(wanted):
+    # returns the descriptor limit in effect afterwards
+    try:
+        import resource
+    except ImportError:
+        return wanted
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < wanted:
+        soft = wanted if hard == resource.RLIM_INFINITY else min(wanted, hard)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (soft, hard))
+    return soft
+
+async def load_test(sessions, host="127.0.0.1", port=None, seed=None):
+    # Plays `sessions` concurrent bot matches against the server at
+    # host:port, or against one started in this process when port is None.
+    # Each session needs two client sockets, plus two server sockets when
+    # the server runs in-process.
+    wanted = (2 if port is not None else 4) * sessions + 256
+    limit = raise_file_limit(wanted)
+    if limit < wanted:
+        raise RuntimeError(f"{sessions} sessions need {wanted} file descriptors, the limit is {limit}")
+    game_server = None
+    if port is None:
+        game_server = GameServer(seed=seed)
+        server = await game_server.serve(host, 0)
+        port = server.sockets[0].getsockname()[1]
+    rngs = [random.Random(int(s.generate_state(1)[0])) for s in np.random.SeedSequence(seed).spawn(2 * sessions)]
+    latencies = []
+    start = time.perf_counter()
+    outcomes = await asyncio.gather(*[random_client(host, port, f"bot{i}", rng, latencies) for i, rng in enumerate(rngs)], return_exceptions=True)
+    elapsed = time.perf_counter() - start
+    results = {
+        "sessions": sessions,
+        "failed_clients": sum(1 for outcome in outcomes if outcome != FINISHED),
+        "rallies": len(latencies) // 2,
+        "seconds": elapsed,
+        "rallies_per_second": len(latencies) / 2 / elapsed,
+    }
+    latencies = np.array(latencies) if latencies else np.zeros(1)
+    results["latency_p50_ms"] = float(np.percentile(latencies, 50) * 1e3)
+    results["latency_p99_ms"] = float(np.percentile(latencies, 99) * 1e3)
+    if game_server is not None:
+        while game_server.sessions:
+            await asyncio.sleep(0.01)
+        server.close()
+        await server.wait_closed()
+        results["finished_sessions"] = game_server.finished_sessions
+    return results
+
+async def serve_forever(host, port, move_timeout):
+    server = await GameServer(move_timeout=move_timeout).serve(host, port)
+    async with server:
+        await server.serve_forever()
+
+def main():
+    parser = argparse.ArgumentParser(description="beach chess game server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--move-timeout", type=float, default=60.0)
+    parser.add_argument("--load-test", type=int, metavar="SESSIONS", help="play this many concurrent bot sessions and report throughput")
+    parser.add_argument("--connect", action="store_true", help="load test the server at --host/--port instead of one in this process")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--profile", metavar="PATH", help="time the engine phases and write them to PATH on exit, Prometheus text for .prom, JSON otherwise")
+    args = parser.parse_args()
+    profiler = enable_profiling() if args.profile else None
+    try:
+        if args.load_test:
+            port = args.port if args.connect else None
+            print(json.dumps(asyncio.run(load_test(args.load_test, args.host, port, args.seed)), indent=2, sort_keys=True))
+        else:
+            asyncio.run(serve_forever(args.host, args.port, args.move_timeout))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if profiler is not None:
+            profiler.write(args.profile)
+
+if __name__ == '__main__':
+    main()
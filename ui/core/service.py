@@ -0,0 +1,254 @@
+import argparse
+import asyncio
+import json
+import multiprocessing
+import time
+import numpy as np
+
+from .cache import ruleset_for
+from .core import ATTACKS, BLOCKS, DEFENSES, RULES, defense_chances, spawn_seeds
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# Stateless rally resolution over HTTP. POST /resolve takes
+#   {"rallies": [[attack, block, defense1, defense2], ...]}
+# as JSON (or msgpack with Content-Type: application/msgpack) and answers
+#   {"defended": [...], "chance": [...], "defense_score": [...],
+#    "attack_score": [...], "comment": [...]}
+# with one entry per rally. Comments are keys into core's text lookups,
+# "defense_made/<chance>" or "successful_attack/<chance>".
+# Requests arriving within max_delay of each other are resolved together.
+
+ACTION_LIMITS = np.array([len(ATTACKS.ATTACK_LIST), len(BLOCKS.BLOCK_LIST), len(DEFENSES.DEFENSE_LIST), len(DEFENSES.DEFENSE_LIST)])
+
+class BadRequest(Exception):
+    pass
+
+def resolve_rallies(lookup, rng, rallies):
+    # the rule and noise model of Rally.calc_outcome for an (n, 4) action array
+    chance = defense_chances(lookup, rallies[:, 0], rallies[:, 1], rallies[:, 2], rallies[:, 3])
+    n = len(rallies)
+    defense_score = chance * rng.uniform(low=0.95, high=1.05, size=n)
+    attack_score = rng.integers(0, 101, size=n) * rng.uniform(low=0.95, high=1.05, size=n)
+    defended = attack_score <= defense_score
+    # both scores tiny is the "puts it in out" comment, whoever wins
+    tiny = (attack_score <= 5) & (defense_score <= 5)
+    comment_made = defended | tiny
+    comment_chance = np.where(tiny, 5, chance)
+    return chance, defense_score, attack_score, defended, comment_made, comment_chance
+
+def comment_keys(comment_made, comment_chance):
+    return [f"{'defense_made' if made else 'successful_attack'}/{chance}" for made, chance in zip(comment_made.tolist(), comment_chance.tolist())]
+
+def parse_rallies(rallies):
+    # integers only, a float would be truncated to some action and a huge
+    # integer makes numpy fall back to objects
+    try:
+        rallies = np.asarray(rallies)
+        if rallies.size and rallies.dtype.kind not in "iu":
+            raise TypeError("rallies must hold integers")
+        rallies = rallies.astype(np.int64).reshape(-1, 4)
+    except (TypeError, ValueError, OverflowError):
+        raise BadRequest("rallies must be a list of [attack, block, defense1, defense2]")
+    if ((rallies < 0) | (rallies >= ACTION_LIMITS)).any():
+        raise BadRequest("action index out of range")
+    return rallies
+
+class Batcher:
+    # Collects the rallies of concurrent requests and resolves them in one
+    # vectorized call once max_batch rallies are pending or max_delay passed.
+    def __init__(self, lookup, rng, max_batch=65536, max_delay=0.001):
+        self.lookup = lookup
+        self.rng = rng
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.pending = []
+        self.pending_rallies = 0
+        self.timer = None
+        self.batches = 0
+
+    def submit(self, rallies):
+        future = asyncio.get_running_loop().create_future()
+        self.pending.append((rallies, future))
+        self.pending_rallies += len(rallies)
+        if self.pending_rallies >= self.max_batch:
+            self.flush()
+        elif self.timer is None:
+            self.timer = asyncio.get_running_loop().call_later(self.max_delay, self.flush)
+        return future
+
+    def flush(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        pending, self.pending, self.pending_rallies = self.pending, [], 0
+        if not pending:
+            return
+        self.batches += 1
+        results = resolve_rallies(self.lookup, self.rng, np.concatenate([rallies for rallies, _ in pending]))
+        start = 0
+        for rallies, future in pending:
+            end = start + len(rallies)
+            if not future.cancelled():
+                future.set_result([result[start:end] for result in results])
+            start = end
+
+def encode(body, content_type):
+    if content_type == "application/msgpack" and msgpack is not None:
+        return msgpack.packb(body)
+    return json.dumps(body, separators=(',', ':')).encode()
+
+def decode(data, content_type):
+    try:
+        if content_type == "application/msgpack" and msgpack is not None:
+            return msgpack.unpackb(data)
+        return json.loads(data)
+    except ValueError:
+        raise BadRequest("body is not valid")
+
+STATUS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed"}
+
+class RallyService:
+    def __init__(self, lookup, rng, max_batch=65536, max_delay=0.001):
+        self.batcher = Batcher(lookup, rng, max_batch, max_delay)
+
+    async def respond(self, writer, status, body, content_type="application/json"):
+        payload = encode(body, content_type)
+        writer.write(
+            f"HTTP/1.1 {status} {STATUS[status]}\r\nContent-Type: {content_type}\r\nContent-Length: {len(payload)}\r\n\r\n".encode() + payload
+        )
+        await writer.drain()
+
+    async def handle(self, method, path, content_type, body):
+        if path == "/health":
+            return 200, {"status": "ok", "batches": self.batcher.batches}
+        if path != "/resolve":
+            return 404, {"error": "not found"}
+        if method != "POST":
+            return 405, {"error": "use POST"}
+        request = decode(body, content_type)
+        if not isinstance(request, dict):
+            raise BadRequest("body must be an object")
+        rallies = parse_rallies(request.get("rallies", []))
+        chance, defense_score, attack_score, defended, comment_made, comment_chance = await self.batcher.submit(rallies)
+        return 200, {
+            "defended": defended.tolist(),
+            "chance": chance.tolist(),
+            "defense_score": defense_score.round(2).tolist(),
+            "attack_score": attack_score.round(2).tolist(),
+            "comment": comment_keys(comment_made, comment_chance),
+        }
+
+    async def handle_connection(self, reader, writer):
+        # HTTP/1.1 with keep-alive, just enough of it for thin clients
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                lines = head.decode("latin-1").split("\r\n")
+                method, path, _ = lines[0].split(" ", 2)
+                headers = {}
+                for line in lines[1:]:
+                    if ":" in line:
+                        name, value = line.split(":", 1)
+                        headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                content_type = headers.get("content-type", "application/json").split(";")[0]
+                if content_type != "application/msgpack" or msgpack is None:
+                    content_type = "application/json"
+                try:
+                    status, response = await self.handle(method, path, content_type, body)
+                except BadRequest as e:
+                    status, response = 400, {"error": str(e)}
+                await self.respond(writer, status, response, content_type)
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+async def serve(host, port, seed, max_batch, max_delay, reuse_port=False):
+    ruleset = ruleset_for(RULES)
+    service = RallyService(ruleset.lookup, np.random.default_rng(seed), max_batch, max_delay)
+    server = await asyncio.start_server(service.handle_connection, host, port, reuse_port=reuse_port, backlog=4096)
+    async with server:
+        await server.serve_forever()
+
+def run_worker(host, port, seed, max_batch, max_delay, reuse_port):
+    try:
+        asyncio.run(serve(host, port, seed, max_batch, max_delay, reuse_port))
+    except KeyboardInterrupt:
+        pass
+
+def run_service(host="127.0.0.1", port=8766, workers=1, seed=None, max_batch=65536, max_delay=0.001):
+    # several workers share the port through SO_REUSEPORT, each with its own random stream
+    seeds = spawn_seeds(seed, workers)
+    if workers == 1:
+        run_worker(host, port, seeds[0], max_batch, max_delay, False)
+        return
+    processes = [multiprocessing.Process(target=run_worker, args=(host, port, s, max_batch, max_delay, True)) for s in seeds]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+
+async def bench_client(host, port, requests, batch_size, rng, latencies):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for _ in range(requests):
+            rallies = np.column_stack([rng.integers(0, limit, size=batch_size) for limit in ACTION_LIMITS]).tolist()
+            body = json.dumps({"rallies": rallies}).encode()
+            start = time.perf_counter()
+            writer.write(f"POST /resolve HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body)
+            head = await reader.readuntil(b"\r\n\r\n")
+            length = int(head.split(b"Content-Length:")[1].split(b"\r\n")[0])
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - start)
+    finally:
+        writer.close()
+
+async def bench(host, port, connections, requests, batch_size, seed=None):
+    rngs = [np.random.default_rng(s) for s in spawn_seeds(seed, connections)]
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*[bench_client(host, port, requests, batch_size, rng, latencies) for rng in rngs])
+    elapsed = time.perf_counter() - start
+    latencies = np.array(latencies)
+    return {
+        "connections": connections,
+        "requests": len(latencies),
+        "rallies_per_request": batch_size,
+        "seconds": elapsed,
+        "requests_per_second": len(latencies) / elapsed,
+        "rallies_per_second": len(latencies) * batch_size / elapsed,
+        "latency_p50_ms": float(np.percentile(latencies, 50) * 1e3),
+        "latency_p99_ms": float(np.percentile(latencies, 99) * 1e3),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="batched rally resolution service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--max-batch", type=int, default=65536, help="rallies resolved in one call at most")
+    parser.add_argument("--max-delay", type=float, default=0.001, help="seconds a request waits for others to join its batch")
+    parser.add_argument("--bench", action="store_true", help="benchmark the service running at --host/--port")
+    parser.add_argument("--connections", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=200, help="requests per connection")
+    parser.add_argument("--batch-size", type=int, default=16, help="rallies per request")
+    args = parser.parse_args()
+    if args.bench:
+        print(json.dumps(asyncio.run(bench(args.host, args.port, args.connections, args.requests, args.batch_size, args.seed)), indent=2, sort_keys=True))
+    else:
+        run_service(args.host, args.port, args.workers, args.seed, args.max_batch, args.max_delay)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+import multiprocessing
+from collections import namedtuple
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+import numpy as np
+
+# Workers attach by segment name and get read-only views, so a pool holds
+# a single copy of every table no matter how many processes it runs.
+SharedTable = namedtuple('SharedTable', ['segment', 'shape', 'dtype'])
+
+_WORKER_SEGMENTS = []
+_WORKER_TABLES = {}
+
+def ruleset_tables(ruleset):
+    # the arrays of a cache.Ruleset, ready to publish
+    tables = {name: table for name, table in ruleset._asdict().items() if isinstance(table, np.ndarray)}
+    if ruleset.value is not None:
+        tables["value"] = np.array([ruleset.value])
+    return tables
+
+class SharedTables:
+    def __init__(self, tables):
+        self.segments = []
+        self.handles = {}
+        for name, table in tables.items():
+            table = np.ascontiguousarray(table)
+            segment = shared_memory.SharedMemory(create=True, size=max(table.nbytes, 1))
+            self.segments.append(segment)
+            np.ndarray(table.shape, table.dtype, buffer=segment.buf)[...] = table
+            self.handles[name] = SharedTable(segment.name, table.shape, table.dtype.str)
+
+    def close(self):
+        for segment in self.segments:
+            segment.close()
+            segment.unlink()
+        self.segments = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def attach(handles):
+    # read-only views of published tables, the segments stay mapped for the
+    # life of the process
+    tables = {}
+    for name, handle in handles.items():
+        segment = shared_memory.SharedMemory(name=handle.segment)
+        _WORKER_SEGMENTS.append(segment)
+        table = np.ndarray(handle.shape, np.dtype(handle.dtype), buffer=segment.buf)
+        table.flags.writeable = False
+        tables[name] = table
+    return tables
+
+def attach_worker(handles):
+    # Pool initializer
+    _WORKER_TABLES.update(attach(handles))
+
+def worker_tables():
+    return _WORKER_TABLES
+
+@contextmanager
+def shared_pool(tables, processes=None):
+    # a process pool whose workers see tables through worker_tables(), the
+    # segments are unlinked once the pool has shut down
+    with SharedTables(tables) as shared:
+        pool = multiprocessing.Pool(processes, initializer=attach_worker, initargs=(shared.handles,))
+        try:
+            yield pool
+        finally:
+            pool.terminate()
+            pool.join()
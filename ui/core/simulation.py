@@ -0,0 +1,58 @@
+from collections import namedtuple
+import numpy as np
+
+from .core import ATTACKS, BLOCKS, DEFENSES, WINNING_SCORE, defense_chances
+
+MatchResults = namedtuple('MatchResults', ['score', 'rallies', 'first_server'])
+
+def random_attack(rng, attacker_score, defender_score):
+    return rng.integers(0, len(ATTACKS.ATTACK_LIST), size=len(attacker_score))
+
+def random_defense(rng, defender_score, attacker_score):
+    n = len(defender_score)
+    block = rng.integers(0, len(BLOCKS.BLOCK_LIST), size=n)
+    defense1 = rng.integers(0, len(DEFENSES.DEFENSE_LIST), size=n)
+    defense2 = rng.integers(0, len(DEFENSES.DEFENSE_LIST), size=n)
+    return block, defense1, defense2
+
+def games_finished(score, target=WINNING_SCORE):
+    # vectorized Game.game_finished for an (n, 2) score array
+    return (score.max(axis=1) >= target) & (np.abs(score[:, 0] - score[:, 1]) >= 2)
+
+def defense_wins(rng, chance):
+    # the noise model of Rally.calc_outcome, one draw per element
+    n = len(chance)
+    defense_score = chance * rng.uniform(low=0.95, high=1.05, size=n)
+    attack_score = rng.integers(0, 101, size=n) * rng.uniform(low=0.95, high=1.05, size=n)
+    return attack_score <= defense_score
+
+def simulate_matches(n, lookup, attack_strategy=random_attack, defense_strategy=random_defense, target=WINNING_SCORE, rng=None):
+    # Strategies are called once per rally for all live matches with
+    # (rng, own_score, opponent_score) and return index arrays: attack
+    # strategies one array, defense strategies (block, defense1, defense2).
+    # rng may be a Generator or anything seeding one, e.g. one of core.spawn_seeds
+    rng = np.random.default_rng(rng)
+    score = np.zeros((n, 2), dtype=np.int16)
+    rallies = np.zeros(n, dtype=np.int32)
+    first_server = rng.integers(0, 2, size=n).astype(np.int8)
+    defender = first_server.copy()
+    live = np.arange(n)
+    while len(live):
+        live_score = score[live]
+        live_defender = defender[live]
+        live_attacker = 1 - live_defender
+        rows = np.arange(len(live))
+        defender_score = live_score[rows, live_defender]
+        attacker_score = live_score[rows, live_attacker]
+
+        attack = attack_strategy(rng, attacker_score, defender_score)
+        block, defense1, defense2 = defense_strategy(rng, defender_score, attacker_score)
+        chance = defense_chances(lookup, attack, block, defense1, defense2)
+        winner = np.where(defense_wins(rng, chance), live_defender, live_attacker)
+
+        live_score[rows, winner] += 1
+        score[live] = live_score
+        defender[live] = winner
+        rallies[live] += 1
+        live = live[~games_finished(live_score, target)]
+    return MatchResults(score, rallies, first_server)
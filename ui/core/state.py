@@ -0,0 +1,172 @@
+from collections.abc import MutableMapping
+import numpy as np
+
+from .core import ATTACKS, BLOCKS, DEFENSES, WINNING_SCORE, Attack, Block, Defense, Game, Player, RandomStream, defense_chances
+from .simulation import defense_wins, games_finished
+
+# Struct-of-arrays state of many matches, 13 bytes per match:
+#   actions   int8  [match, seat, (attack, block, defense1, defense2)], -1 unset
+#   score     int16 [match, seat]
+#   defender  int8  [match], the serving seat, -1 before the coin toss
+ATTACK, BLOCK, DEFENSE1, DEFENSE2 = range(4)
+
+UNSET_ATTACK = Attack(-1, "")
+UNSET_BLOCK = Block(-1, "")
+UNSET_DEFENSE = Defense(-1, "")
+
+class MatchState:
+    def __init__(self, n):
+        self.actions = np.full((n, 2, 4), -1, dtype=np.int8)
+        self.score = np.zeros((n, 2), dtype=np.int16)
+        self.defender = np.full(n, -1, dtype=np.int8)
+
+    def __len__(self):
+        return len(self.defender)
+
+    @property
+    def nbytes(self):
+        return self.actions.nbytes + self.score.nbytes + self.defender.nbytes
+
+    def reset(self, matches=slice(None)):
+        self.actions[matches] = -1
+        self.score[matches] = 0
+        self.defender[matches] = -1
+
+    def coin_toss(self, rng, matches=slice(None)):
+        self.defender[matches] = rng.integers(0, 2, size=len(self.defender[matches]))
+
+    def finished(self, target=WINNING_SCORE):
+        return games_finished(self.score, target)
+
+    def choose(self, matches, attack, block, defense1, defense2):
+        # the attack for each match's attacker, the rest for its defender
+        defender = self.defender[matches].astype(np.intp)
+        self.actions[matches, 1-defender, ATTACK] = attack
+        self.actions[matches, defender, BLOCK] = block
+        self.actions[matches, defender, DEFENSE1] = defense1
+        self.actions[matches, defender, DEFENSE2] = defense2
+
+    def running(self):
+        return np.flatnonzero((self.defender >= 0) & ~self.finished())
+
+    def rally_chances(self, lookup, matches):
+        # (defending seats, attacking seats, defense chances) of the chosen actions
+        defender = self.defender[matches].astype(np.intp)
+        attacker = 1 - defender
+        attack = self.actions[matches, attacker, ATTACK]
+        defense = self.actions[matches, defender]
+        chance = defense_chances(lookup, attack, defense[:, BLOCK], defense[:, DEFENSE1], defense[:, DEFENSE2])
+        return defender, attacker, chance
+
+    def score_rallies(self, matches, winner):
+        # the winner of a rally scores and serves the next one
+        self.score[matches, winner] += 1
+        self.defender[matches] = winner
+
+    def play_rallies(self, lookup, rng, matches=None):
+        # One rally in each of the given matches, all running ones by
+        # default, with the noise model of Rally.calc_outcome. Returns the
+        # matches played and the winning seats.
+        matches = self.running() if matches is None else matches
+        defender, attacker, chance = self.rally_chances(lookup, matches)
+        winner = np.where(defense_wins(rng, chance), defender, attacker)
+        self.score_rallies(matches, winner)
+        return matches, winner
+
+    def game(self, match, player1, player2, lookup, seed=None, verbose=True, log=None):
+        # a Game-compatible view of one match, for the UI and other callers of the object API
+        return GameView(self, match, player1, player2, lookup, seed, verbose, log)
+
+def _action(field, lookup, unset):
+    def get(self):
+        return lookup.get(int(self.state.actions[self.match, self.seat, field]), unset)
+    def set(self, action):
+        self.state.actions[self.match, self.seat, field] = action.index
+    return property(get, set)
+
+class PlayerView:
+    # Player API over one seat of a MatchState, the actions live in the arrays
+    __slots__ = ('state', 'match', 'seat', 'name', 'computer')
+
+    def __init__(self, state, match, seat, name, computer=None):
+        self.state = state
+        self.match = match
+        self.seat = seat
+        self.name = name
+        self.computer = computer
+
+    attack = _action(ATTACK, ATTACKS.ATTACK_DICT, UNSET_ATTACK)
+    block = _action(BLOCK, BLOCKS.BLOCK_DICT, UNSET_BLOCK)
+    defense1 = _action(DEFENSE1, DEFENSES.DEFENSE_DICT, UNSET_DEFENSE)
+    defense2 = _action(DEFENSE2, DEFENSES.DEFENSE_DICT, UNSET_DEFENSE)
+
+    get_name = Player.get_name
+    set_attack = Player.set_attack
+    get_attack = Player.get_attack
+    set_block = Player.set_block
+    get_block = Player.get_block
+    set_defense1 = Player.set_defense1
+    set_defense2 = Player.set_defense2
+    set_defense = Player.set_defense
+    get_defense = Player.get_defense
+
+class ScoreView(MutableMapping):
+    # the {name: points} dict of Game over a MatchState row
+    __slots__ = ('state', 'match', 'names')
+
+    def __init__(self, state, match, names):
+        self.state = state
+        self.match = match
+        self.names = names
+
+    def __getitem__(self, name):
+        return int(self.state.score[self.match, self.names.index(name)])
+
+    def __setitem__(self, name, points):
+        self.state.score[self.match, self.names.index(name)] = points
+
+    def __delitem__(self, name):
+        raise TypeError("players cannot leave a match")
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __len__(self):
+        return 2
+
+    def __repr__(self):
+        return repr(dict(self))
+
+class GameView(Game):
+    # Game over one row of a MatchState. The rally logic is Game's own, only
+    # the players, the serve and the score read and write the arrays.
+    def __init__(self, state, match, player1, player2, lookup, seed=None, verbose=True, log=None):
+        self.state = state
+        self.match = match
+        self.players = [PlayerView(state, match, seat, player.name, player.computer) for seat, player in enumerate([player1, player2])]
+        self.score = ScoreView(state, match, (player1.name, player2.name))
+        self.lookup = lookup
+        self.current_comment = ""
+        self.random = RandomStream(seed)
+        self.verbose = verbose
+        self.moves = []
+        self.log = log
+        self.match_id = match
+
+    @property
+    def current_defender(self):
+        defender = self.state.defender[self.match]
+        return self.players[defender] if defender >= 0 else None
+
+    @current_defender.setter
+    def current_defender(self, player):
+        self.state.defender[self.match] = -1 if player is None else player.seat
+
+    @property
+    def current_attacker(self):
+        defender = self.state.defender[self.match]
+        return self.players[1-defender] if defender >= 0 else None
+
+    @current_attacker.setter
+    def current_attacker(self, player):
+        self.state.defender[self.match] = -1 if player is None else 1 - player.seat
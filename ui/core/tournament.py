@@ -0,0 +1,248 @@
+import argparse
+import itertools
+import json
+import os
+import time
+import numpy as np
+
+from .ai import AdaptiveOpponent, PolicyOpponent, ScriptedOpponent, cumulative_policy
+from .analytics import uniform_opponent
+from .cache import ruleset_for
+from .core import ATTACKS, BLOCKS, DEFENSES, RULES, STEPS, Game, Player
+from .rules import rules_hash
+from .shared import ruleset_tables, shared_pool, worker_tables
+
+# Round robin between registered strategies: every pairing plays `matches`
+# core.Game matches, cut into shards that a process pool plays in any
+# order. Finished shards are appended to progress.jsonl in the output
+# directory, a rerun with the same settings only plays the missing ones.
+
+STRATEGIES = {}
+
+def strategy(name):
+    # a strategy builds a fresh computer player for one match from a Stable and an rng
+    def register(factory):
+        STRATEGIES[name] = factory
+        return factory
+    return register
+
+class Stable:
+    # the ruleset tables strategies are built from, prepared once per worker
+    def __init__(self, tables):
+        self.lookup = tables["lookup"]
+        self.payoff = tables["payoff"]
+        self.attack_cdf = cumulative_policy(tables["attack_strategy"])
+        self.defense_cdf = cumulative_policy(tables["defense_strategy"])
+
+@strategy("random")
+def random_strategy(stable, rng):
+    return uniform_opponent(rng)
+
+@strategy("equilibrium")
+def equilibrium_strategy(stable, rng):
+    return PolicyOpponent(stable.attack_cdf, stable.defense_cdf, rng)
+
+@strategy("adaptive")
+def adaptive_strategy(stable, rng):
+    return AdaptiveOpponent(stable.payoff, stable.attack_cdf, stable.defense_cdf, rng)
+
+@strategy("scripted")
+def scripted_strategy(stable, rng):
+    return ScriptedOpponent(
+        [ATTACKS.LINE_HIT, ATTACKS.LINE_HIT, ATTACKS.DIA_HIT],
+        [(BLOCKS.LINE, DEFENSES.CUT, DEFENSES.LINE_HIT), (BLOCKS.DIA, DEFENSES.LINE_HIT, DEFENSES.DIA_HIT)],
+    )
+
+_STABLE = []
+
+def worker_stable():
+    if not _STABLE:
+        _STABLE.append(Stable(worker_tables()))
+    return _STABLE[0]
+
+def play_shard(task):
+    # Plays one shard in a pool worker. Seats alternate between matches and
+    # every match is seeded from (seed, pairing, shard, match), so a shard
+    # plays the same wherever and whenever it runs.
+    strategies, first, second, shard, matches, seed = task
+    stable = worker_stable()
+    wins = [0, 0]
+    points = [0, 0]
+    rallies = 0
+    # the winning side of each match in order, "0" for first
+    outcomes = []
+    for match in range(matches):
+        game_seed, player_seed = np.random.SeedSequence(seed, spawn_key=(first, second, shard, match)).spawn(2)
+        rng = np.random.default_rng(player_seed)
+        players = [
+            Player("first", STRATEGIES[strategies[first]](stable, rng)),
+            Player("second", STRATEGIES[strategies[second]](stable, rng)),
+        ]
+        seats = players[::-1] if match % 2 else players
+        game = Game(seats[0], seats[1], stable.lookup, game_seed, verbose=False)
+        game.coin_toss()
+        while not game.game_finished():
+            for step in STEPS[:-1]:
+                game.update(game.computer_action(step), step)
+        score = [game.score["first"], game.score["second"]]
+        wins[score[1] > score[0]] += 1
+        outcomes.append("1" if score[1] > score[0] else "0")
+        points[0] += score[0]
+        points[1] += score[1]
+        rallies += len(game.moves)
+    return {"first": strategies[first], "second": strategies[second], "shard": shard, "matches": matches, "wins": wins, "points": points, "rallies": rallies, "outcomes": "".join(outcomes)}
+
+class EloTable:
+    # Elo ratings updated match by match as shards come in. They depend on
+    # the order shards finish in, the report ranks by fit_ratings instead.
+    def __init__(self, strategies, k=16.0, initial=1500.0):
+        self.k = k
+        self.ratings = {name: initial for name in strategies}
+        self.matches = {name: 0 for name in strategies}
+        self.wins = {name: 0 for name in strategies}
+        self.points = {name: [0, 0] for name in strategies}
+        self.head_to_head = {}
+
+    def update(self, result):
+        first, second = result["first"], result["second"]
+        for outcome in result["outcomes"]:
+            expected = 1 / (1 + 10 ** ((self.ratings[second] - self.ratings[first]) / 400))
+            change = self.k * ((outcome == "0") - expected)
+            self.ratings[first] += change
+            self.ratings[second] -= change
+        for name, own, other in [(first, 0, 1), (second, 1, 0)]:
+            self.matches[name] += result["matches"]
+            self.wins[name] += result["wins"][own]
+            self.points[name][0] += result["points"][own]
+            self.points[name][1] += result["points"][other]
+        pair = self.head_to_head.setdefault(f"{first} vs {second}", [0, 0])
+        pair[0] += result["wins"][0]
+        pair[1] += result["wins"][1]
+
+    def report(self):
+        fitted = fit_ratings(list(self.ratings), self.head_to_head)
+        return {
+            "ratings": [
+                {
+                    "strategy": name,
+                    "rating": round(fitted[name], 1),
+                    "elo": round(self.ratings[name], 1),
+                    "matches": self.matches[name],
+                    "win_rate": self.wins[name] / max(self.matches[name], 1),
+                    "point_share": self.points[name][0] / max(sum(self.points[name]), 1),
+                }
+                for name in sorted(fitted, key=fitted.get, reverse=True)
+            ],
+            "head_to_head": self.head_to_head,
+        }
+
+def fit_ratings(strategies, head_to_head, iterations=500, initial=1500.0):
+    # Bradley-Terry strengths by the MM algorithm on the Elo scale, the
+    # same for any order of results. Half a win each way per pairing keeps
+    # a strategy that never won finite.
+    index = {name: i for i, name in enumerate(strategies)}
+    wins = np.zeros((len(strategies), len(strategies)))
+    for pair, (first_wins, second_wins) in head_to_head.items():
+        first, second = (index[name] for name in pair.split(" vs "))
+        wins[first, second] += first_wins + 0.5
+        wins[second, first] += second_wins + 0.5
+    games = wins + wins.T
+    strength = np.ones(len(strategies))
+    for _ in range(iterations):
+        strength = wins.sum(axis=1) / (games / (strength[:, None] + strength[None, :])).sum(axis=1)
+        strength /= np.exp(np.log(strength).mean())
+    return {name: initial + 400 * np.log10(strength[i]) for name, i in index.items()}
+
+def read_progress(path):
+    # (settings, completed shard results) of an earlier run, (None, []) if
+    # there was none or it was interrupted before its header was written
+    # out, then the file is started over. A result line cut short by an
+    # interrupted run is dropped from the file, so appending continues on
+    # a clean line.
+    if not os.path.exists(path):
+        return None, []
+    with open(path) as f:
+        lines = f.read().split("\n")
+    try:
+        header = json.loads(lines[0]) if len(lines) > 1 else None
+    except ValueError:
+        header = None
+    if header is None:
+        return None, []
+    results = []
+    for line in lines[1:-1]:
+        try:
+            results.append(json.loads(line))
+        except ValueError:
+            break
+    if lines[-1] or len(results) != len(lines) - 2:
+        with open(path, "w") as f:
+            f.write("".join(line + "\n" for line in lines[:len(results)+1]))
+    return header, results
+
+def run_tournament(strategies, matches, out_dir, shard_size=250, seed=None, processes=None, rules=RULES):
+    # without a seed a resumed run keeps the seed of the run it continues
+    os.makedirs(out_dir, exist_ok=True)
+    progress_path = os.path.join(out_dir, "progress.jsonl")
+    previous, done = read_progress(progress_path)
+    if seed is None:
+        seed = previous["seed"] if previous is not None else np.random.SeedSequence().entropy
+    header = {"strategies": strategies, "matches": matches, "shard_size": shard_size, "seed": seed, "rules": rules_hash(rules)}
+    if previous is not None and previous != header:
+        raise ValueError(f"{progress_path} belongs to a tournament with other settings")
+    table = EloTable(strategies)
+    for result in done:
+        table.update(result)
+    finished = {(result["first"], result["second"], result["shard"]) for result in done}
+
+    tasks = []
+    for first, second in itertools.combinations(range(len(strategies)), 2):
+        for shard, start in enumerate(range(0, matches, shard_size)):
+            if (strategies[first], strategies[second], shard) not in finished:
+                tasks.append((strategies, first, second, shard, min(shard_size, matches - start), seed))
+
+    start = time.perf_counter()
+    played = 0
+    with open(progress_path, "a" if previous is not None else "w") as progress:
+        if previous is None:
+            progress.write(json.dumps(header) + "\n")
+        if tasks:
+            with shared_pool(ruleset_tables(ruleset_for(rules)), processes) as pool:
+                for result in pool.imap_unordered(play_shard, tasks):
+                    progress.write(json.dumps(result) + "\n")
+                    progress.flush()
+                    table.update(result)
+                    played += result["matches"]
+
+    report = table.report()
+    report["settings"] = header
+    report["played_now"] = played
+    report["seconds"] = time.perf_counter() - start
+    with open(os.path.join(out_dir, "report.json"), "w") as f:
+        json.dump(report, f, indent=2)
+    return report
+
+def format_report(report):
+    lines = [f"{'strategy':14s} {'rating':>8s} {'elo':>8s} {'matches':>9s} {'win rate':>9s} {'points':>7s}"]
+    for row in report["ratings"]:
+        lines.append(f"{row['strategy']:14s} {row['rating']:8.1f} {row['elo']:8.1f} {row['matches']:9d} {row['win_rate']:9.3f} {row['point_share']:7.3f}")
+    lines.append("")
+    for pair, (first_wins, second_wins) in report["head_to_head"].items():
+        lines.append(f"{pair:30s} {first_wins:7d} : {second_wins:<7d}")
+    return "\n".join(lines)
+
+def main():
+    parser = argparse.ArgumentParser(description="round-robin tournament between computer strategies")
+    parser.add_argument("--strategies", nargs="+", default=list(STRATEGIES), choices=list(STRATEGIES))
+    parser.add_argument("--matches", type=int, default=1000, help="matches per pairing")
+    parser.add_argument("--shard-size", type=int, default=250)
+    parser.add_argument("--out", default="tournament", help="directory for progress.jsonl and report.json")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--processes", type=int)
+    args = parser.parse_args()
+    report = run_tournament(args.strategies, args.matches, args.out, args.shard_size, args.seed, args.processes)
+    print(format_report(report))
+    print(f"\n{report['played_now']} matches in {report['seconds']:.1f}s")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+from collections import OrderedDict
+import pygame
+
+from core import core
+
+FACE = "Helvetica"
+
+class FontCache:
+    # Resolves every (face, size, bold) once and keeps rendered text surfaces
+    # in an LRU. Cached surfaces are shared, callers only blit them.
+    def __init__(self, max_surfaces=1024):
+        self.fonts = {}
+        self.surfaces = OrderedDict()
+        self.max_surfaces = max_surfaces
+
+    def font(self, size, bold=False, face=FACE):
+        key = (face, size, bold)
+        if key not in self.fonts:
+            self.fonts[key] = pygame.font.SysFont(face, size, bold=bold)
+        return self.fonts[key]
+
+    def render(self, text, size, color, bold=False, face=FACE, cache=True):
+        # cache=False for one-off text that would only push useful entries out
+        if not cache:
+            return self.font(size, bold, face).render(text, True, color)
+        key = (text, size, tuple(color), bold, face)
+        surf = self.surfaces.get(key)
+        if surf is not None:
+            self.surfaces.move_to_end(key)
+            return surf
+        surf = self.font(size, bold, face).render(text, True, color)
+        self.surfaces[key] = surf
+        if len(self.surfaces) > self.max_surfaces:
+            self.surfaces.popitem(last=False)
+        return surf
+
+    def prewarm(self, texts, size, color, bold=False, face=FACE):
+        for text in texts:
+            self.render(text, size, color, bold, face)
+
+fonts = FontCache()
+
+def commentary_texts(player_names):
+    # every comment a rally between these players can produce
+    templates = list(core.DEFENSE_MADE_TEXT_LOOKUP.values()) + list(core.SUCCESSFUL_ATTACK_TEXT_LOOKUP.values())
+    for attacker, defender in [player_names, player_names[::-1]]:
+        for template in templates:
+            for attack in core.ATTACKS.ATTACK_LIST:
+                for block in core.BLOCKS.BLOCK_LIST:
+                    yield core.print_commentary(template, attack, block, block, attacker, defender)
+
+def score_texts(player_names, max_score=core.WINNING_SCORE+10):
+    for name in player_names:
+        for points in range(max_score+1):
+            yield f"{name}: {points}"
@@ -0,0 +1,272 @@
+import pygame
+
+from resources import fonts
+
+from pygame.locals import (
+    K_1,
+    K_2,
+    K_3,
+    K_4,
+    K_5,
+    K_6,
+    K_RETURN,
+    KEYDOWN,
+)
+
+number_keys = [
+    K_1,
+    K_2,
+    K_3,
+    K_4,
+    K_5,
+    K_6,
+]
+
+BLACK = pygame.Color(0, 0, 0)
+WHITE = pygame.Color(255, 255, 255)
+RED = pygame.Color(255, 0, 0)
+GREEN = pygame.Color(0, 255, 0)
+BLUE = pygame.Color(0, 0, 128)
+MIK_YELLOW = pygame.Color(250, 203, 3)
+MIK_BLUE = pygame.Color(22, 45, 142)
+MIK_GOLD = pygame.Color(161, 135, 115)
+
+SCREEN_WIDTH = 800
+SCREEN_HEIGHT = 600
+
+# static screens composed once, shared by every sprite (and session) showing them
+screen_cache = {}
+
+def display_format(surf):
+    # converted to the display's pixel format so blitting it needs no conversion
+    return surf.convert() if pygame.display.get_surface() is not None else surf
+
+class InputBox(pygame.sprite.Sprite):
+    def __init__(self, x, y, w, h, text=''):
+        super(InputBox, self).__init__()
+        self.show = False
+        self.color = MIK_GOLD
+        self.text = text
+        self.W = w
+        self.H = h
+        self.X = x
+        self.Y = y
+        self.surf = display_format(pygame.Surface((self.W, self.H)))
+        self.surf.fill(MIK_BLUE)
+        self.font_size = 20
+        self.text_surf = fonts.render(text, self.font_size, self.color)
+        self.rect = self.surf.get_rect(
+            center=(
+                self.X+self.W/2,
+                self.Y+self.H/2
+            )
+        )
+        self.active = False
+
+    def toggle(self):
+        self.show = not self.show
+
+    def reset_surface(self):
+        # reuse the surface, only clear it
+        self.surf.fill(MIK_BLUE)
+        self.rect = self.surf.get_rect(
+            center=(
+                self.X+self.W/2,
+                self.Y+self.H/2
+            )
+        )
+
+    def get_text(self):
+        return self.text
+
+    def handle_event(self, event):
+        if event.type == pygame.MOUSEBUTTONDOWN:
+            # If the user clicked on the input_box rect.
+            if self.rect.collidepoint(event.pos):
+                # Toggle the active variable.
+                self.active = not self.active
+            else:
+                self.active = False
+            # Change the current color of the input box.
+            self.color = MIK_YELLOW if self.active else MIK_GOLD
+        if event.type == pygame.KEYDOWN:
+            if self.active:
+                if event.key == pygame.K_BACKSPACE:
+                    self.text = self.text[:-1]
+                elif event.key == K_RETURN:
+                    self.text = self.text
+                else:
+                    self.text += event.unicode
+                # Re-render the text.
+                self.text_surf = fonts.render(self.text, self.font_size, self.color)
+
+    def update(self):
+        # Resize the box if the text is too long.
+        self.reset_surface()
+        width = max(200, self.text_surf.get_width()+10)
+        self.rect.w = width
+        self.surf.blit(self.text_surf, [self.W/2-self.text_surf.get_width()/2, self.H/2-self.text_surf.get_height()/2])
+
+class ActionSprite(pygame.sprite.Sprite):
+    def __init__(self, text, idx):
+        super(ActionSprite, self).__init__()
+        self.idx = idx
+        self.text_surf = fonts.render(f"{text} ({idx+1})", 20, WHITE)
+        self.W = 600
+        self.H = 70
+        self.surf = pygame.Surface((self.W, self.H))
+        self.surf.fill(MIK_BLUE)
+        self.rect = self.surf.get_rect(
+            center=(
+                SCREEN_WIDTH/2,
+                150+self.idx*self.H+self.idx*5
+            )
+        )
+        self.surf.blit(self.text_surf, [self.W/2-self.text_surf.get_width()/2, self.H/2-self.text_surf.get_height()/2])
+
+class ChooseSprite(pygame.sprite.Sprite):
+    def __init__(self, action_list, name):
+        super(ChooseSprite, self).__init__()
+        self.name = name
+        self.text_surf = fonts.render(f"Choose {name}, confirm with Enter.", 20, BLACK)
+        self.action_sprites = pygame.sprite.Group()
+        for idx, action in enumerate(action_list):
+            self.action_sprites.add(ActionSprite(action.name, action.index))
+        key = (name, tuple(action_list))
+        if key not in screen_cache:
+            screen_cache[key] = self.compose()
+        self.surf = screen_cache[key]
+        self.rect = self.surf.get_rect(
+            center=(
+                SCREEN_WIDTH/2,
+                SCREEN_HEIGHT/2
+            )
+        )
+        self.keys_to_handle = [number_keys[i] for i, _ in enumerate(self.action_sprites)]
+        self.action_list = action_list
+        self.reset()
+
+    def compose(self):
+        # the menu never changes, header and all actions go into one layer
+        surf = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+        surf.fill((MIK_YELLOW))
+        surf.blit(self.text_surf, [100, 50])
+        for action in self.action_sprites:
+            surf.blit(action.surf, action.rect)
+        return display_format(surf)
+
+    def reset(self):
+        self.done = False
+        self.action = None
+
+    def handle_event(self, event):
+        if event.type == KEYDOWN:
+            if event.key in self.keys_to_handle:
+                try:
+                    self.done = True
+                    self.action = self.action_list[int(event.unicode)-1]
+                except ValueError:
+                    print(f"not a valid action: {event.unicode}")
+
+
+    def update(self, r, s):
+        pass
+
+class ResultSprite(pygame.sprite.Sprite):
+    def __init__(self):
+        super(ResultSprite, self).__init__()
+        self.name = "result"
+        self.font_size = 25
+        self.font_size_stats = 15
+        self.text_surf_result = fonts.render("", self.font_size, MIK_YELLOW)
+        self.text_surf_stats = fonts.render("", self.font_size_stats, MIK_GOLD)
+        self.W = SCREEN_WIDTH
+        self.H = SCREEN_HEIGHT
+        self.surf = display_format(pygame.Surface((self.W, self.H)))
+        self.surf.fill(MIK_BLUE)
+        self.rect = self.surf.get_rect(
+            center=(
+                SCREEN_WIDTH/2,
+                SCREEN_HEIGHT/2
+            )
+        )
+        self.action = None
+        self.done = True
+        self.reset()
+
+    def reset(self):
+        self.done = True
+        self.action = None
+
+    def reset_surface(self):
+        # reuse the surface, only clear it
+        self.surf.fill(MIK_BLUE)
+        self.rect = self.surf.get_rect(
+            center=(
+                SCREEN_WIDTH/2,
+                SCREEN_HEIGHT/2
+            )
+        )
+
+    def handle_event(self, event):
+        pass
+
+    def blit_result(self):
+        self.surf.blit(self.text_surf_result, [self.W/2-self.text_surf_result.get_width()/2, self.H/2-self.text_surf_result.get_height()/2])
+        self.surf.blit(self.text_surf_stats, [self.W/2-self.text_surf_stats.get_width()/2, self.H/3-self.text_surf_stats.get_height()/2])
+
+    def update(self, result_text, stats_text):
+        self.reset_surface()
+        self.text_surf_result = fonts.render(f"{result_text}", self.font_size, MIK_YELLOW)
+        # the stats hold the rally's random scores and never repeat
+        self.text_surf_stats = fonts.render(f"{stats_text}", self.font_size_stats, MIK_GOLD, cache=False)
+        self.blit_result()
+
+class ScoreSprite(pygame.sprite.Sprite):
+    def __init__(self):
+        super(ScoreSprite, self).__init__()
+        self.font_size = 20
+        self.text_surf_player1 = fonts.render("player: 0", self.font_size, WHITE)
+        self.text_surf_player2 = fonts.render("player: 0", self.font_size, WHITE)
+        self.W = 140
+        self.H = 80
+        self.surf = display_format(pygame.Surface((self.W, self.H)))
+        self.surf.fill(MIK_BLUE)
+        self.rect = self.surf.get_rect(
+            center=(
+                SCREEN_WIDTH-170,
+                50
+            )
+        )
+        self.blit_score_board((10, self.text_surf_player1.get_height()))
+
+    def blit_score_board(self, circle_pos):
+        pygame.draw.circle(self.surf, WHITE, circle_pos, 2)
+        self.surf.blit(self.text_surf_player1, [20, self.text_surf_player1.get_height()/2])
+        self.surf.blit(self.text_surf_player2, [20, self.H-self.text_surf_player2.get_height() * 1.5])
+
+    def reset_surface(self):
+        # reuse the surface, only clear it
+        self.surf.fill(MIK_BLUE)
+        self.rect = self.surf.get_rect(
+            center=(
+                SCREEN_WIDTH-170,
+                50
+            )
+        )
+
+    def render_score(self, score, defender, attacker):
+        p_names = list([attacker, defender])
+        p_names.sort()
+        if p_names[0] == attacker:
+            circle_pos = (10, self.text_surf_player1.get_height())
+        else:
+            circle_pos = (10, self.H-self.text_surf_player2.get_height())
+        self.text_surf_player1 = fonts.render(f"{p_names[0]}: {score[p_names[0]]}", self.font_size, WHITE)
+        self.text_surf_player2 = fonts.render(f"{p_names[1]}: {score[p_names[1]]}", self.font_size, WHITE)
+        return circle_pos
+
+    def update(self, score, defender, attacker):
+        self.reset_surface()
+        circle_pos = self.render_score(score, defender, attacker)
+        self.blit_score_board(circle_pos)